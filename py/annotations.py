@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/20 9:30
+@File    : annotations.py
+@Author  : zj
+@Description:
+
+Streaming iterators over VOC, VOCLike and YOLOv5 annotations for in-process use.
+
+Files are discovered lazily one directory at a time and parsed one by one, so memory stays constant no matter how
+large the dataset is. Each image is yielded as a compact `ImageRecord`:
+
+    image_path, label_path: str
+    width, height:          int
+    boxes:                  ndarray (N, 4) float64, [xmin, ymin, xmax, ymax] in pixels
+    class_ids:              ndarray (N,) int64, index into `classes`, -1 if the name is unknown
+    names:                  tuple of N class names
+    difficult:              ndarray (N,) bool
+
+Usage:
+    >>> from annotations import iter_voclike, batched
+    >>> for record in iter_voclike('assets/voclike', 'assets/voclike', classes=['cat', 'dog']):
+    ...     print(record.image_path, record.boxes, record.class_ids)
+    >>> for records in batched(iter_voclike('assets/voclike', 'assets/voclike'), 256):
+    ...     print(len(records))
+
+"""
+from typing import Dict, List, Iterable, Iterator, NamedTuple, Optional, Sequence, Set, Tuple
+
+import io
+import os
+import glob
+import itertools
+
+import numpy as np
+from numpy import ndarray
+from PIL import Image
+import xml.etree.ElementTree as ET
+
+from sharding import in_shard
+from exclude import is_excluded
+from vocabulary import Vocabulary
+
+EXIF_ORIENTATION = 0x0112
+
+
+class ImageRecord(NamedTuple):
+    image_path: str
+    label_path: str
+    width: int
+    height: int
+    boxes: ndarray
+    class_ids: ndarray
+    names: Tuple[str, ...]
+    difficult: ndarray
+
+
+def load_classes(class_path: str) -> List[str]:
+    return Vocabulary.load(class_path).names
+
+
+def walk_files(root: str, suffix: str, sort: bool = True) -> Iterator[str]:
+    """
+    Yield files ending with `suffix` under `root`. Every directory is listed and sorted before its files are
+    yielded, with `sort=False` directories are read lazily with `os.scandir` in filesystem order instead, so even a
+    directory with millions of files is never listed in memory.
+    """
+    if not sort:
+        dir_stack = [root]
+        while dir_stack:
+            with os.scandir(dir_stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        dir_stack.append(entry.path)
+                    elif entry.name.endswith(suffix):
+                        yield entry.path
+        return
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.endswith(suffix):
+                yield os.path.join(dir_path, file_name)
+
+
+def _class_index(classes: Optional[Sequence[str]]) -> Dict[str, int]:
+    if isinstance(classes, Vocabulary):
+        # Aliases included
+        return classes.id_dict
+    return {} if classes is None else {name: idx for idx, name in enumerate(classes)}
+
+
+def _text(node: ET.Element, path: str, default: str = '0') -> str:
+    text = node.findtext(path)
+    return default if text is None else text.strip()
+
+
+def read_voc_xml(xml_path: str, image_path: str, class_index: Dict[str, int],
+                 data: Optional[bytes] = None) -> ImageRecord:
+    # `data` is the content of `xml_path` if it was already read, e.g. by `async_io.AsyncFileIO`
+    root = ET.parse(xml_path).getroot() if data is None else ET.fromstring(data)
+    object_list = root.findall('object')
+
+    num = len(object_list)
+    boxes = np.zeros((num, 4), dtype=np.float64)
+    class_ids = np.full(num, -1, dtype=np.int64)
+    difficult = np.zeros(num, dtype=bool)
+    names = list()
+    for i, obj in enumerate(object_list):
+        name = _text(obj, 'name', '')
+        names.append(name)
+        class_ids[i] = class_index.get(name, -1)
+        difficult[i] = int(_text(obj, 'difficult')) != 0
+        boxes[i] = [float(_text(obj, 'bndbox/xmin')), float(_text(obj, 'bndbox/ymin')),
+                    float(_text(obj, 'bndbox/xmax')), float(_text(obj, 'bndbox/ymax'))]
+
+    return ImageRecord(image_path=image_path, label_path=xml_path,
+                       width=int(_text(root, 'size/width')), height=int(_text(root, 'size/height')),
+                       boxes=boxes, class_ids=class_ids, names=tuple(names), difficult=difficult)
+
+
+def image_size(image_path) -> Tuple[int, int]:
+    """
+    (width, height) from the image header, rotated as `cv2.imread` does for EXIF orientation 5 to 8.
+
+    `image_path` can also be a file object, e.g. `io.BytesIO` of the image bytes.
+    """
+    with Image.open(image_path) as image:
+        img_w, img_h = image.size
+        if image.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):
+            img_w, img_h = img_h, img_w
+    return img_w, img_h
+
+
+def exif_size(image_path) -> Tuple[int, int]:
+    """
+    (width, height) as `exif_size` in YOLOv5, which only rotates for EXIF orientation 6 and 8. Shapes in
+    `labels.cache` must match what a YOLOv5 rescan would store.
+    """
+    with Image.open(image_path) as image:
+        img_w, img_h = image.size
+        if image.getexif().get(EXIF_ORIENTATION, 1) in (6, 8):
+            img_w, img_h = img_h, img_w
+    return img_w, img_h
+
+
+def read_yolo_txt(image_path: str, label_path: str, classes: Optional[Sequence[str]] = None,
+                  image_data: Optional[bytes] = None, label_data: Optional[bytes] = None) -> ImageRecord:
+    # Only the image header is read to get the size
+    img_w, img_h = image_size(image_path if image_data is None else io.BytesIO(image_data))
+
+    labels = np.zeros((0, 5), dtype=np.float64)
+    if (os.path.getsize(label_path) if label_data is None else len(label_data)) > 0:
+        labels = np.loadtxt(label_path if label_data is None else io.BytesIO(label_data),
+                            dtype=np.float64, delimiter=' ', ndmin=2)
+        assert labels.shape[1] >= 5, label_path
+        labels = labels[:, :5]
+
+    class_ids = labels[:, 0].astype(np.int64)
+    x_c, y_c, box_w, box_h = labels[:, 1], labels[:, 2], labels[:, 3], labels[:, 4]
+    boxes = np.stack([(x_c - box_w / 2) * img_w, (y_c - box_h / 2) * img_h,
+                      (x_c + box_w / 2) * img_w, (y_c + box_h / 2) * img_h], axis=1)
+    names = tuple(classes[i] if classes is not None and 0 <= i < len(classes) else str(i) for i in class_ids)
+
+    return ImageRecord(image_path=image_path, label_path=label_path, width=img_w, height=img_h,
+                       boxes=boxes, class_ids=class_ids, names=names, difficult=np.zeros(len(class_ids), dtype=bool))
+
+
+def iter_voclike(image_dir: str, label_dir: str, classes: Optional[Sequence[str]] = None,
+                 num_shards: int = 1, shard_index: int = 0, exclude: Optional[Set[str]] = None,
+                 sort: bool = True) -> Iterator[ImageRecord]:
+    """
+    Iterate VOCLike data, `<label_dir>/**/aaaa.xml` is paired with `<image_dir>/**/aaaa.jpg`.
+
+    With `sort=False` files are yielded in filesystem order, see `walk_files`.
+    """
+    class_index = _class_index(classes)
+    for image_path, xml_path in iter_voclike_paths(image_dir, label_dir, num_shards=num_shards,
+                                                   shard_index=shard_index, exclude=exclude, sort=sort):
+        yield read_voc_xml(xml_path, image_path, class_index)
+
+
+def iter_voclike_paths(image_dir: str, label_dir: str, num_shards: int = 1, shard_index: int = 0,
+                       exclude: Optional[Set[str]] = None, sort: bool = True,
+                       check_image: bool = True) -> Iterator[Tuple[str, str]]:
+    """
+    Iterate (image_path, xml_path) of VOCLike data. Without `check_image` there is no stat per image, a missing
+    image fails when it is read.
+    """
+    assert os.path.isdir(image_dir) and os.path.isdir(label_dir), "Image and label directories must exist"
+
+    for xml_path in walk_files(label_dir, ".xml", sort=sort):
+        if not in_shard(xml_path, num_shards, shard_index):
+            continue
+        image_path = xml_path.replace(label_dir, image_dir).replace(".xml", ".jpg")
+        if exclude and is_excluded(image_path, exclude):
+            continue
+        assert not check_image or os.path.isfile(image_path), image_path
+        yield image_path, xml_path
+
+
+def iter_voc(root: str, year: str = '2007', image_set: str = 'train', classes: Optional[Sequence[str]] = None,
+             num_shards: int = 1, shard_index: int = 0, exclude: Optional[Set[str]] = None) -> Iterator[ImageRecord]:
+    """
+    Iterate an extracted Pascal VOC dataset, `root` is the directory containing `VOCdevkit/`.
+    """
+    voc_root = os.path.join(root, "VOCdevkit", f"VOC{year}")
+    image_set_path = os.path.join(voc_root, "ImageSets", "Main", f"{image_set}.txt")
+    assert os.path.isfile(image_set_path), image_set_path
+
+    class_index = _class_index(classes)
+    with open(image_set_path, 'r') as f:
+        for line in f:
+            image_name = line.strip()
+            if not image_name or not in_shard(image_name, num_shards, shard_index):
+                continue
+            xml_path = os.path.join(voc_root, "Annotations", f"{image_name}.xml")
+            image_path = os.path.join(voc_root, "JPEGImages", f"{image_name}.jpg")
+            if exclude and is_excluded(image_path, exclude):
+                continue
+            yield read_voc_xml(xml_path, image_path, class_index)
+
+
+def iter_yolo(root: str, classes: Optional[Sequence[str]] = None,
+              num_shards: int = 1, shard_index: int = 0, exclude: Optional[Set[str]] = None) -> Iterator[ImageRecord]:
+    """
+    Iterate YOLOv5 data, `<root>/labels/aaaa.txt` is paired with `<root>/images/aaaa.jpg`. Labels without image are skipped.
+    """
+    for image_path, label_path in iter_yolo_paths(root, num_shards=num_shards, shard_index=shard_index,
+                                                  exclude=exclude):
+        yield read_yolo_txt(image_path, label_path, classes)
+
+
+def iter_yolo_paths(root: str, num_shards: int = 1, shard_index: int = 0, exclude: Optional[Set[str]] = None,
+                    check_image: bool = True) -> Iterator[Tuple[str, str]]:
+    """
+    Iterate (image_path, label_path) of YOLOv5 data. Without `check_image` labels without image are not skipped
+    here, so the caller must handle missing images.
+    """
+    image_root = os.path.join(root, "images")
+    assert os.path.isdir(image_root), image_root
+    label_root = os.path.join(root, "labels")
+    assert os.path.isdir(label_root), label_root
+
+    # Only the top level of labels/, like YOLOv5 itself
+    for label_path in sorted(glob.glob(os.path.join(label_root, "*.txt"))):
+        if not in_shard(label_path, num_shards, shard_index):
+            continue
+        image_path = label_path.replace(label_root, image_root).replace(".txt", ".jpg")
+        if exclude and is_excluded(image_path, exclude):
+            continue
+        if not check_image or os.path.isfile(image_path):
+            yield image_path, label_path
+
+
+def batched(records: Iterable[ImageRecord], batch_size: int) -> Iterator[List[ImageRecord]]:
+    assert batch_size > 0, batch_size
+    iterator = iter(records)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_voclike_batches(image_dir: str, label_dir: str, batch_size: int, **kwargs) -> Iterator[List[ImageRecord]]:
+    return batched(iter_voclike(image_dir, label_dir, **kwargs), batch_size)
+
+
+def iter_voc_batches(root: str, batch_size: int, **kwargs) -> Iterator[List[ImageRecord]]:
+    return batched(iter_voc(root, **kwargs), batch_size)
+
+
+def iter_yolo_batches(root: str, batch_size: int, **kwargs) -> Iterator[List[ImageRecord]]:
+    return batched(iter_yolo(root, **kwargs), batch_size)
+
+
+def record_to_yolov5(record: ImageRecord, skip_difficult: bool = True) -> ndarray:
+    """
+    Convert a record to YOLOv5 labels, [cls_id, x_center, y_center, box_w, box_h] normalized by the image size.
+    """
+    keep = ~record.difficult if skip_difficult else np.ones(len(record.class_ids), dtype=bool)
+    assert np.all(record.class_ids[keep] >= 0), [n for n, k in zip(record.names, keep) if k]
+
+    boxes = record.boxes[keep]
+    labels = np.empty((len(boxes), 5), dtype=np.float64)
+    labels[:, 0] = record.class_ids[keep]
+    labels[:, 1] = (boxes[:, 0] + boxes[:, 2]) / 2 / record.width
+    labels[:, 2] = (boxes[:, 1] + boxes[:, 3]) / 2 / record.height
+    labels[:, 3] = (boxes[:, 2] - boxes[:, 0]) / record.width
+    labels[:, 4] = (boxes[:, 3] - boxes[:, 1]) / record.height
+    return labels
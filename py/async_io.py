@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/24 15:10
+@File    : async_io.py
+@Author  : zj
+@Description:
+
+Asynchronous file I/O for datasets on high-latency storage (NFS, object storage FUSE mounts).
+
+On such mounts every open, stat and read blocks for milliseconds, so reading one file after the other leaves the
+converter idle most of the time. `AsyncFileIO` runs an asyncio event loop in a background thread and keeps many
+file operations in flight:
+
+    read_ahead  reads the files of the next `--read-ahead` items while the current one is processed, at most
+                `--io-concurrency` operations run at the same time
+    write       buffers small writes and issues them together in batches of `--write-batch`, errors are raised
+                at the next flush
+
+The blocking calls themselves run in a thread pool through the event loop, there is no portable non-blocking file
+API. `LatencyFS` is a local filesystem stand-in that sleeps before every read, write and isfile call, to test and
+tune the settings without network storage.
+
+Usage: Convert with 32 concurrent file operations:
+    $ python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --io-concurrency 32
+
+Usage: Compare sequential and asynchronous reads of a directory with 5ms injected latency per operation:
+    $ python3 py/async_io.py assets/voclike --io-latency 5 --io-concurrency 32
+
+"""
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import os
+import time
+import asyncio
+import argparse
+import threading
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+
+T = TypeVar('T')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Async IO")
+    parser.add_argument('src', metavar='SRC', type=str,
+                        help='Directory, all files are read.')
+    add_io_args(parser)
+    args = parser.parse_args()
+    print("args:", args)
+    return args
+
+
+def add_io_args(parser: argparse.ArgumentParser):
+    parser.add_argument('--io-concurrency', metavar='N', type=int, default=None,
+                        help='Use asynchronous I/O with at most N file operations in flight.')
+    parser.add_argument('--read-ahead', metavar='N', type=int, default=64,
+                        help='Number of items read ahead with asynchronous I/O.')
+    parser.add_argument('--write-batch', metavar='N', type=int, default=32,
+                        help='Number of buffered writes issued together with asynchronous I/O.')
+    parser.add_argument('--io-latency', metavar='MS', type=float, default=0,
+                        help='Inject MS milliseconds of latency per file operation, for testing.')
+
+
+class LocalFS:
+
+    def read_bytes(self, path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def write_bytes(self, path: str, data: bytes):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def isfile(self, path: str) -> bool:
+        return os.path.isfile(path)
+
+
+class LatencyFS(LocalFS):
+    """
+    Local files with `latency` seconds of delay per `read_bytes`, `write_bytes` and `isfile` call, stands in for
+    network storage in tests.
+    """
+
+    def __init__(self, latency: float = 0.005):
+        self.latency = latency
+
+    def read_bytes(self, path: str) -> bytes:
+        time.sleep(self.latency)
+        return super().read_bytes(path)
+
+    def write_bytes(self, path: str, data: bytes):
+        time.sleep(self.latency)
+        super().write_bytes(path, data)
+
+    def isfile(self, path: str) -> bool:
+        time.sleep(self.latency)
+        return super().isfile(path)
+
+
+class AsyncFileIO:
+
+    def __init__(self, fs: Optional[LocalFS] = None, concurrency: int = 16, read_ahead: int = 64,
+                 write_batch: int = 32):
+        assert concurrency > 0 and read_ahead > 0 and write_batch > 0
+        self.fs = LocalFS() if fs is None else fs
+        self.read_ahead_size = read_ahead
+        self.write_batch = write_batch
+
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.semaphore = self._run(self._new_semaphore(concurrency)).result()
+
+        # Converters write from several threads
+        self.write_lock = threading.Lock()
+        self.write_buffer: List[Tuple[str, bytes]] = list()
+        self.write_futures = collections.deque()
+
+    def _run(self, coroutine) -> Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    @staticmethod
+    async def _new_semaphore(concurrency: int) -> asyncio.Semaphore:
+        # Created inside the loop it belongs to
+        return asyncio.Semaphore(concurrency)
+
+    async def _call(self, fn: Callable, *args):
+        async with self.semaphore:
+            return await self.loop.run_in_executor(self.executor, fn, *args)
+
+    async def _read(self, path: str, missing_ok: bool) -> Optional[bytes]:
+        try:
+            return await self._call(self.fs.read_bytes, path)
+        except FileNotFoundError:
+            if missing_ok:
+                return None
+            raise
+
+    async def _read_all(self, paths: Sequence[str], missing_ok: bool) -> List[Optional[bytes]]:
+        return await asyncio.gather(*(self._read(path, missing_ok) for path in paths))
+
+    async def _write_all(self, batch: List[Tuple[str, bytes]]):
+        await asyncio.gather(*(self._call(self.fs.write_bytes, path, data) for path, data in batch))
+
+    def read_ahead(self, items: Iterable[T], paths_of: Callable[[T], Sequence[str]],
+                   missing_ok: bool = False) -> Iterator[Tuple[T, List[Optional[bytes]]]]:
+        """
+        Yield (item, [bytes of each path]) in order, the files of the next items are read in the background.
+
+        With `missing_ok` a missing file gives None instead of raising FileNotFoundError.
+        """
+        pending = collections.deque()
+        for item in items:
+            pending.append((item, self._run(self._read_all(list(paths_of(item)), missing_ok))))
+            if len(pending) >= self.read_ahead_size:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+
+    def read_bytes(self, path: str) -> bytes:
+        return self._run(self._read(path, False)).result()
+
+    def isfile(self, path: str) -> bool:
+        return self._run(self._call(self.fs.isfile, path)).result()
+
+    def write(self, path: str, data: bytes):
+        with self.write_lock:
+            self.write_buffer.append((path, data))
+            if len(self.write_buffer) >= self.write_batch:
+                self._submit_writes()
+
+    def _submit_writes(self):
+        if self.write_buffer:
+            self.write_futures.append(self._run(self._write_all(self.write_buffer)))
+            self.write_buffer = list()
+        # Bound the memory held by data waiting to be written
+        while len(self.write_futures) > self.read_ahead_size:
+            self.write_futures.popleft().result()
+
+    def flush(self):
+        with self.write_lock:
+            self._submit_writes()
+            while self.write_futures:
+                self.write_futures.popleft().result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def build_fs(args) -> LocalFS:
+    return LatencyFS(args.io_latency / 1000) if args.io_latency > 0 else LocalFS()
+
+
+def build_io(args) -> Optional[AsyncFileIO]:
+    if args.io_concurrency is None:
+        return None
+    return AsyncFileIO(build_fs(args), concurrency=args.io_concurrency, read_ahead=args.read_ahead,
+                       write_batch=args.write_batch)
+
+
+def main(args):
+    path_list = sorted(os.path.join(dir_path, file_name)
+                       for dir_path, _, file_names in os.walk(args.src) for file_name in file_names)
+    print(f"Found {len(path_list)} files in {args.src}")
+
+    fs = build_fs(args)
+    start = time.time()
+    num_bytes = sum(len(fs.read_bytes(path)) for path in path_list)
+    sequential = time.time() - start
+    print(f"Sequential: {num_bytes} bytes in {sequential:.3f}s")
+
+    concurrency = 16 if args.io_concurrency is None else args.io_concurrency
+    with AsyncFileIO(fs, concurrency=concurrency, read_ahead=args.read_ahead, write_batch=args.write_batch) as aio:
+        start = time.time()
+        num_bytes = sum(len(data) for _, (data,) in aio.read_ahead(path_list, lambda path: [path]))
+        duration = time.time() - start
+    print(f"Async ({concurrency} in flight): {num_bytes} bytes in {duration:.3f}s, "
+          f"{sequential / max(duration, 1e-9):.1f}x faster")
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/21 16:45
+@File    : check_images.py
+@Author  : zj
+@Description:
+
+Scan images in parallel for corruption and duplicates.
+
+Integrity is checked without decoding:
+    JPEG: the file starts with the SOI marker (FFD8) and ends with the EOI marker (FFD9)
+    PNG:  the signature is valid, the CRC of every chunk matches and the last chunk is IEND
+With `--verify` every image is also fully decoded with cv2.
+
+Exact duplicates share the same content hash (blake2b). Near duplicates are found with a 64 bit difference hash
+(dHash) on a reduced-size decode: images whose hashes differ in at most `--hash-threshold` bits are reported.
+The hash is split into `threshold + 1` bands, two hashes within the threshold must agree on at least one band,
+so only images sharing a band value are compared.
+
+Every corrupt image and every duplicate except the first one (sorted by path) is written to `exclude.txt`, which
+can be passed to the converters with `--exclude`, see `py/exclude.py`.
+
+Usage: Check images and write an exclusion list:
+    $ python3 py/check_images.py assets/voclike ./output/check/
+    $ python3 py/check_images.py ../datasets/voc ./output/check/ --verify --near
+    $ python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --exclude ./output/check/exclude.txt
+
+"""
+from typing import Dict, List, Optional, Tuple
+
+import os
+import zlib
+import struct
+import hashlib
+import argparse
+import collections
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+CHUNK_SIZE = 1 << 20
+# Upper bound of hash pairs compared at once, so a large band bucket is compared block by block
+PAIR_BLOCK = 1 << 22
+POPCOUNT = np.array([bin(x).count('1') for x in range(256)], dtype=np.uint8)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check Images")
+    parser.add_argument('src', metavar='SRC', type=str,
+                        help='Image root, searched recursively.')
+    parser.add_argument('dst', metavar='DST', type=str,
+                        help='Save data dir.')
+
+    parser.add_argument('--verify', action='store_true', default=False,
+                        help='Fully decode every image.')
+    parser.add_argument('--near', action='store_true', default=False,
+                        help='Also find near duplicates with a perceptual hash.')
+    parser.add_argument('--hash-threshold', metavar='THRESHOLD', type=int, default=4,
+                        help='Maximum number of different dHash bits for near duplicates.')
+    parser.add_argument('--workers', metavar='WORKERS', type=int, default=os.cpu_count(),
+                        help='Number of processes.')
+    args = parser.parse_args()
+    print("args:", args)
+    return args
+
+
+def check_jpeg(f) -> Optional[str]:
+    if f.read(2) != b'\xff\xd8':
+        return 'missing JPEG SOI marker'
+    f.seek(0, os.SEEK_END)
+    if f.tell() < 4:
+        return 'truncated JPEG'
+    # Some encoders pad after EOI, so look for it near the end
+    f.seek(max(0, f.tell() - 32))
+    if b'\xff\xd9' not in f.read():
+        return 'missing JPEG EOI marker, truncated'
+    return None
+
+
+def check_png(f) -> Optional[str]:
+    if f.read(8) != PNG_SIGNATURE:
+        return 'invalid PNG signature'
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return 'truncated PNG, no IEND chunk'
+        length, chunk_type = struct.unpack('>I4s', header)
+        crc = zlib.crc32(chunk_type)
+        remaining = length
+        while remaining > 0:
+            data = f.read(min(remaining, CHUNK_SIZE))
+            if not data:
+                return f'truncated PNG {chunk_type.decode("latin-1")} chunk'
+            crc = zlib.crc32(data, crc)
+            remaining -= len(data)
+        expected = f.read(4)
+        if len(expected) < 4 or struct.unpack('>I', expected)[0] != crc:
+            return f'PNG CRC mismatch in {chunk_type.decode("latin-1")} chunk'
+        if chunk_type == b'IEND':
+            return None
+
+
+def file_hash(image_path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(image_path, 'rb') as f:
+        for data in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(data)
+    return h.hexdigest()
+
+
+def dhash(image_path: str) -> Optional[int]:
+    # A reduced-size decode is enough for a 9x8 thumbnail
+    flag = cv2.IMREAD_REDUCED_GRAYSCALE_8 if image_path.lower().endswith(('.jpg', '.jpeg')) else cv2.IMREAD_GRAYSCALE
+    image = cv2.imread(image_path, flag)
+    if image is None:
+        return None
+    thumb = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).ravel()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def check_image(item: Tuple[str, bool, bool]) -> Tuple[str, Optional[str], str, Optional[int]]:
+    """
+    Return (image_path, error, content hash, dhash) of one image.
+    """
+    image_path, verify, near = item
+    try:
+        with open(image_path, 'rb') as f:
+            if image_path.lower().endswith('.png'):
+                error = check_png(f)
+            else:
+                error = check_jpeg(f)
+    except OSError as e:
+        return image_path, str(e), '', None
+
+    if error is None and verify and cv2.imread(image_path, cv2.IMREAD_UNCHANGED) is None:
+        error = 'decode failed'
+    if error is not None:
+        return image_path, error, '', None
+    return image_path, None, file_hash(image_path), dhash(image_path) if near else None
+
+
+def hamming_distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    xor = np.bitwise_xor(a[:, None], b[None, :])
+    return POPCOUNT[xor.view(np.uint8)].reshape(len(a), len(b), 8).sum(axis=-1)
+
+
+def find_near_duplicates(path_list: List[str], hash_list: List[int], threshold: int) -> List[Tuple[str, str, int]]:
+    hashes = np.array(hash_list, dtype=np.uint64)
+    num_bands = threshold + 1
+    band_bits = 64 // num_bands
+
+    pair_dict = dict()
+    for band in range(num_bands):
+        shift = band * band_bits
+        bits = 64 - shift if band == num_bands - 1 else band_bits
+        keys = (hashes >> np.uint64(shift)) & np.uint64((1 << bits) - 1)
+        order = np.argsort(keys, kind='stable')
+        bounds = np.flatnonzero(np.diff(keys[order])) + 1
+        for bucket in np.split(order, bounds):
+            if len(bucket) < 2:
+                continue
+            bucket_hashes = hashes[bucket]
+            # Many similar images, e.g. uniform ones, share a band, so the N x N matrix is never built at once
+            block = max(1, PAIR_BLOCK // len(bucket))
+            for start in range(0, len(bucket), block):
+                distance = hamming_distance(bucket_hashes[start:start + block], bucket_hashes)
+                rows, cols = np.nonzero(distance <= threshold)
+                for row, col in zip(rows, cols):
+                    i, j = int(bucket[start + row]), int(bucket[col])
+                    if i < j:
+                        pair_dict[(i, j)] = int(distance[row, col])
+    return [(path_list[i], path_list[j], d) for (i, j), d in sorted(pair_dict.items())]
+
+
+def main(args):
+    image_list = list()
+    print(f"Retrieval {args.src}")
+    for dir_path, _, file_names in os.walk(args.src):
+        for file_name in file_names:
+            if file_name.lower().endswith(IMAGE_SUFFIXES):
+                image_list.append(os.path.abspath(os.path.join(dir_path, file_name)))
+    image_list.sort()
+
+    corrupt_list = list()
+    hash_dict: Dict[str, List[str]] = collections.defaultdict(list)
+    near_paths = list()
+    near_hashes = list()
+    with Pool(args.workers) as pool:
+        items = [(image_path, args.verify, args.near) for image_path in image_list]
+        for image_path, error, content_hash, phash in tqdm(pool.imap(check_image, items, chunksize=64),
+                                                           total=len(items)):
+            if error is not None:
+                corrupt_list.append((image_path, error))
+                continue
+            hash_dict[content_hash].append(image_path)
+            if phash is not None and len(hash_dict[content_hash]) == 1:
+                near_paths.append(image_path)
+                near_hashes.append(phash)
+
+    exclude_list = [image_path for image_path, _ in corrupt_list]
+    duplicate_groups = [path_list for path_list in hash_dict.values() if len(path_list) > 1]
+    for path_list in duplicate_groups:
+        exclude_list.extend(path_list[1:])
+    near_pairs = find_near_duplicates(near_paths, near_hashes, args.hash_threshold) if args.near else []
+    excluded = set(exclude_list)
+    for _, path_b, _ in near_pairs:
+        if path_b not in excluded:
+            excluded.add(path_b)
+            exclude_list.append(path_b)
+
+    save_root = args.dst
+    if not os.path.exists(save_root):
+        os.makedirs(save_root)
+    with open(os.path.join(save_root, "corrupt.txt"), 'w') as f:
+        f.writelines(f"{image_path}\t{error}\n" for image_path, error in corrupt_list)
+    with open(os.path.join(save_root, "duplicates.txt"), 'w') as f:
+        f.writelines('\t'.join(path_list) + '\n' for path_list in duplicate_groups)
+    if args.near:
+        with open(os.path.join(save_root, "near_duplicates.txt"), 'w') as f:
+            f.writelines(f"{path_a}\t{path_b}\t{distance}\n" for path_a, path_b, distance in near_pairs)
+    with open(os.path.join(save_root, "exclude.txt"), 'w') as f:
+        f.writelines(image_path + '\n' for image_path in exclude_list)
+
+    print(f"Checked {len(image_list)} images: {len(corrupt_list)} corrupt, "
+          f"{sum(len(x) - 1 for x in duplicate_groups)} exact duplicates, {len(near_pairs)} near duplicate pairs")
+    print(f"Save to {save_root}")
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -5,9 +5,200 @@
 @file: dataset.py
 @author: zj
 @description:
+
+Readers of the tar shards written by `py/voc2yolov5.py` and `py/voc2coco.py` with `--tar-shards`.
+
+TarShardDataset streams the shards sequentially, every worker reads whole shards from start to end, and samples
+are mixed by shuffling the shard order and a shuffle buffer. TarShardIndex gives random access to samples through
+the index sidecars and memory-mapped shards.
+
+A sample is a dict {'__key__': key, <ext>: data, ...}. With `decode=True` images are decoded with cv2 (BGR),
+`txt` labels to a (N, 5) float32 array and `json` annotations with json.loads.
+
+Usage:
+    >>> dataset = TarShardDataset(sorted(glob.glob('../datasets/voc2yolov5-train/shards/*.tar')), shuffle_buffer=1000)
+    >>> loader = torch.utils.data.DataLoader(dataset, batch_size=None, num_workers=4)
+
+Usage: Read all samples of a shard directory once and report the throughput:
+    $ python3 py/dataset.py ../datasets/voc2yolov5-train/shards/
+
 """
+from typing import Dict, Iterable, Iterator, List
+
+import io
+import os
+import json
+import mmap
+import glob
+import time
+import random
+import tarfile
+import argparse
+
+import cv2
+import numpy as np
+from torch.utils.data import Dataset, IterableDataset, get_worker_info
+
+from tar_shards import index_path_of
+
+IMAGE_EXTS = ('jpg', 'jpeg', 'png', 'webp')
+READ_BUFFER_SIZE = 4 << 20
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tar Shard Dataset")
+    parser.add_argument('shards', metavar='SHARDS', type=str,
+                        help='Directory of tar shards.')
+    parser.add_argument('--shuffle-buffer', metavar='SIZE', type=int, default=0,
+                        help='Number of samples in the shuffle buffer, 0 to read in order.')
+    parser.add_argument('--decode', action='store_true', default=False,
+                        help='Decode images and labels.')
+    args = parser.parse_args()
+    print("args:", args)
+    return args
+
+
+def decode_sample(sample: Dict) -> Dict:
+    for ext, data in sample.items():
+        if ext in IMAGE_EXTS:
+            sample[ext] = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        elif ext == 'txt':
+            # Images without objects have an empty label file, np.loadtxt would warn about every one of them
+            if bytes(data).strip():
+                sample[ext] = np.loadtxt(io.BytesIO(data), dtype=np.float32, ndmin=2).reshape(-1, 5)
+            else:
+                sample[ext] = np.zeros((0, 5), dtype=np.float32)
+        elif ext == 'json':
+            sample[ext] = json.loads(data)
+    return sample
+
+
+def iter_tar_samples(shard_path: str) -> Iterator[Dict]:
+    """
+    Read one shard front to back, members of a sample are stored next to each other.
+    """
+    sample = None
+    with open(shard_path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        # Stream mode, the tar is never seeked
+        with tarfile.open(fileobj=f, mode='r|') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                key, ext = os.path.basename(member.name).split('.', 1)
+                if sample is not None and sample['__key__'] != key:
+                    yield sample
+                    sample = None
+                if sample is None:
+                    sample = {'__key__': key}
+                sample[ext] = tar.extractfile(member).read()
+    if sample is not None:
+        yield sample
+
+
+def shuffle_samples(samples: Iterable[Dict], buffer_size: int, rng: random.Random) -> Iterator[Dict]:
+    buffer = list()
+    for sample in samples:
+        if len(buffer) < buffer_size:
+            buffer.append(sample)
+            continue
+        i = rng.randrange(buffer_size)
+        yield buffer[i]
+        buffer[i] = sample
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+class TarShardDataset(IterableDataset):
+    """
+    Stream samples from tar shards. DataLoader workers split the shards between them, so use at least as many
+    shards as workers.
+    """
+
+    def __init__(self, shard_list: List[str], shuffle_buffer: int = 0, decode: bool = True, seed: int = 0):
+        assert len(shard_list) > 0, "No shards"
+        self.shard_list = list(shard_list)
+        self.shuffle_buffer = shuffle_buffer
+        self.decode = decode
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        # Call before every epoch to get a different order
+        self.epoch = epoch
+
+    def __iter__(self) -> Iterator[Dict]:
+        worker_info = get_worker_info()
+        worker_id, num_workers = (0, 1) if worker_info is None else (worker_info.id, worker_info.num_workers)
+
+        shard_list = list(self.shard_list)
+        if self.shuffle_buffer > 0:
+            # Same shard order in every worker, so each shard is read exactly once per epoch
+            random.Random(self.seed + self.epoch).shuffle(shard_list)
+        shard_list = shard_list[worker_id::num_workers]
+
+        samples = (sample for shard_path in shard_list for sample in iter_tar_samples(shard_path))
+        if self.shuffle_buffer > 0:
+            samples = shuffle_samples(samples, self.shuffle_buffer,
+                                      random.Random((self.seed + self.epoch) * 1000 + worker_id))
+        for sample in samples:
+            yield decode_sample(sample) if self.decode else sample
+
+
+class TarShardIndex(Dataset):
+    """
+    Random access to samples of tar shards through their index sidecars, shards are memory-mapped on first access.
+    """
+
+    def __init__(self, shard_list: List[str], decode: bool = True):
+        self.shard_list = list(shard_list)
+        self.decode = decode
+        self.sample_list = list()
+        for shard_id, shard_path in enumerate(self.shard_list):
+            with open(index_path_of(shard_path), 'r') as f:
+                index = json.load(f)
+            for item in index['samples']:
+                self.sample_list.append((shard_id, item['key'], item['members']))
+        self.mmap_dict: Dict[int, mmap.mmap] = dict()
+
+    def __getstate__(self):
+        # Every DataLoader worker maps the shards itself
+        state = self.__dict__.copy()
+        state['mmap_dict'] = dict()
+        return state
+
+    def _mmap(self, shard_id: int) -> mmap.mmap:
+        if shard_id not in self.mmap_dict:
+            with open(self.shard_list[shard_id], 'rb') as f:
+                self.mmap_dict[shard_id] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.mmap_dict[shard_id]
+
+    def __len__(self) -> int:
+        return len(self.sample_list)
+
+    def __getitem__(self, index: int) -> Dict:
+        shard_id, key, members = self.sample_list[index]
+        mm = self._mmap(shard_id)
+        sample = {'__key__': key}
+        for ext, (offset, size) in members.items():
+            sample[ext] = mm[offset:offset + size]
+        return decode_sample(sample) if self.decode else sample
+
+
+def main(args):
+    shard_list = sorted(glob.glob(os.path.join(args.shards, '*.tar')))
+    print(f"Found {len(shard_list)} shards in {args.shards}")
+    dataset = TarShardDataset(shard_list, shuffle_buffer=args.shuffle_buffer, decode=args.decode)
+
+    num_samples = num_bytes = 0
+    start = time.time()
+    for sample in dataset:
+        num_samples += 1
+        num_bytes += sum(len(v) for k, v in sample.items() if isinstance(v, bytes))
+    duration = max(time.time() - start, 1e-9)
+    print(f"Read {num_samples} samples in {duration:.2f}s, {num_samples / duration:.1f} samples/s, "
+          f"{num_bytes / duration / 1024 / 1024:.1f} MB/s")
 
-from torchvision.datasets import VOCDetection
 
 if __name__ == '__main__':
-    dataset = VOCDetection()
+    args = parse_args()
+    main(args)
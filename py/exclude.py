@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/25 10:20
+@File    : exclude.py
+@Author  : zj
+@Description:
+
+Exclusion lists written by `py/check_images.py`, one image path per line. Converters skip the listed images with
+`--exclude`. Paths are compared as absolute paths, so the list works no matter how the data root is given.
+
+Kept apart from `check_images.py`, so the converters and `annotations.py` do not import cv2 just for a set lookup.
+
+Usage:
+    $ python3 py/check_images.py assets/voclike ./output/check/
+    $ python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --exclude ./output/check/exclude.txt
+
+"""
+from typing import Optional, Set
+
+import os
+import argparse
+
+
+def add_exclude_args(parser: argparse.ArgumentParser):
+    parser.add_argument('--exclude', metavar='EXCLUDE', type=str, default=None,
+                        help='Exclusion list written by check_images.py, listed images are skipped.')
+
+
+def load_exclude(exclude_path: Optional[str]) -> Set[str]:
+    """
+    Load an exclusion list as a set of absolute image paths.
+    """
+    if exclude_path is None:
+        return set()
+    with open(exclude_path, 'r') as f:
+        return {os.path.abspath(line.strip()) for line in f if line.strip()}
+
+
+def is_excluded(image_path: str, exclude_set: Set[str]) -> bool:
+    return len(exclude_set) > 0 and os.path.abspath(str(image_path)) in exclude_set
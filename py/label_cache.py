@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/22 11:05
+@File    : label_cache.py
+@Author  : zj
+@Description:
+
+Write and verify YOLOv5 `labels.cache` files, so training can skip the label scan at startup.
+
+The cache has the same layout as `LoadImagesAndLabels.cache_labels` in YOLOv5 (cache version 0.6):
+
+    {im_file: [labels (N, 5) float32, (width, height), segments], ...,
+     'hash': sha256 of the total file size and all label/image paths,
+     'results': (found, missing, empty, corrupt, total), 'msgs': [], 'version': '0.6'}
+
+It is saved next to `images/` and `labels/` as `labels.cache`. YOLOv5 resolves the dataset path, so image paths
+are stored as absolute real paths and the dataset yaml must point to the same `images/` directory. The hash covers
+every image in `images/`, so a cache goes stale (and YOLOv5 silently rescans) when files are added, removed or
+resized.
+
+`voc2yolov5.py` and `voclike2yolov5.py` write the cache at the end of a non-sharded conversion. After a sharded
+conversion, or to refresh an existing dataset, build it from the files.
+
+Usage: Verify or (re)build the label cache of YOLOv5 data:
+    $ python3 py/label_cache.py verify ./output/yolo_data/
+    $ python3 py/label_cache.py build ./output/yolo_data/
+
+"""
+from typing import Dict, List, Optional, Tuple
+
+import os
+import sys
+import glob
+import hashlib
+import argparse
+
+import numpy as np
+from numpy import ndarray
+
+from annotations import exif_size
+
+CACHE_VERSION = '0.6'
+IMG_FORMATS = ('bmp', 'dng', 'jpeg', 'jpg', 'mpo', 'png', 'tif', 'tiff', 'webp', 'pfm')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Label Cache")
+    parser.add_argument('command', metavar='COMMAND', type=str, choices=['verify', 'build'],
+                        help='Verify the cache or build it from images and labels.')
+    parser.add_argument('root', metavar='ROOT', type=str,
+                        help='YOLOv5 data root path, containing images/ and labels/.')
+    args = parser.parse_args()
+    print("args:", args)
+    return args
+
+
+def get_hash(paths: List[str]) -> str:
+    # Same as utils.dataloaders.get_hash in YOLOv5
+    size = sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+    h = hashlib.sha256(str(size).encode())
+    h.update(''.join(paths).encode())
+    return h.hexdigest()
+
+
+def img2label_paths(img_paths: List[str]) -> List[str]:
+    sa, sb = f'{os.sep}images{os.sep}', f'{os.sep}labels{os.sep}'
+    return [sb.join(x.rsplit(sa, 1)).rsplit('.', 1)[0] + '.txt' for x in img_paths]
+
+
+def list_images(image_root: str) -> List[str]:
+    # The same listing YOLOv5 builds from a resolved image directory
+    image_root = os.path.realpath(image_root)
+    path_list = glob.glob(os.path.join(image_root, '**', '*.*'), recursive=True)
+    return sorted(x for x in path_list if x.split('.')[-1].lower() in IMG_FORMATS)
+
+
+def cache_path_of(image_root: str) -> str:
+    return os.path.join(os.path.dirname(os.path.realpath(image_root)), 'labels.cache')
+
+
+def as_written(labels: ndarray) -> ndarray:
+    """
+    The values YOLOv5 reads back from a label file written with fmt='%f'.
+    """
+    labels = np.asarray(labels, dtype=np.float64).reshape(-1, 5)
+    return np.char.mod('%f', labels).astype(np.float32)
+
+
+def check_labels(labels: ndarray, shape: Tuple[int, int]) -> Optional[str]:
+    """
+    Return an error message for labels YOLOv5 would reject as corrupt, None if they are fine.
+    """
+    if shape[0] <= 9 or shape[1] <= 9:
+        return f'image size {shape} <10 pixels'
+    if len(labels) > 0:
+        if labels.shape[1] != 5:
+            return f'labels require 5 columns, {labels.shape[1]} columns detected'
+        if (labels < 0).any():
+            return f'negative label values {labels[labels < 0]}'
+        if (labels[:, 1:] > 1).any():
+            return f'non-normalized or out of bounds coordinates {labels[:, 1:][labels[:, 1:] > 1]}'
+    return None
+
+
+def write_cache(image_root: str, entries: Dict[str, Tuple[ndarray, Tuple[int, int]]]) -> str:
+    """
+    Write `labels.cache` for `image_root` from {image_path: (labels as written, (width, height))}.
+    """
+    im_files = list_images(image_root)
+    label_files = img2label_paths(im_files)
+    entries = {os.path.realpath(k): v for k, v in entries.items()}
+
+    x = dict()
+    nm, nf, ne, nc, msgs = 0, 0, 0, 0, []
+    for im_file, label_file in zip(im_files, label_files):
+        if im_file in entries:
+            found = True
+            labels, shape = entries[im_file]
+            labels = np.asarray(labels, dtype=np.float32).reshape(-1, 5)
+        else:
+            # Images not written by this run are read from disk, YOLOv5 trains on every image in the directory
+            found = os.path.isfile(label_file)
+            labels, shape = read_label_file(label_file), exif_size(im_file)
+        msg = check_labels(labels, shape)
+        if msg is not None:
+            nc += 1
+            msgs.append(f'WARNING: {im_file}: ignoring corrupt image/label: {msg}')
+            continue
+        if not found:
+            nm += 1
+        elif len(labels) == 0:
+            nf += 1
+            ne += 1
+        else:
+            nf += 1
+            _, i = np.unique(labels, axis=0, return_index=True)
+            if len(i) < len(labels):
+                msgs.append(f'WARNING: {im_file}: {len(labels) - len(i)} duplicate labels removed')
+                labels = labels[np.sort(i)]
+        x[im_file] = [labels, tuple(shape), []]
+
+    x['hash'] = get_hash(label_files + im_files)
+    x['results'] = nf, nm, ne, nc, len(im_files)
+    x['msgs'] = msgs
+    x['version'] = CACHE_VERSION
+
+    cache_path = cache_path_of(image_root)
+    np.save(cache_path, x)
+    # np.save appends .npy, rename like YOLOv5 does
+    os.replace(cache_path + '.npy', cache_path)
+    print(f"Save label cache to {cache_path}: {nf} found, {nm} missing, {ne} empty, {nc} corrupt")
+    return cache_path
+
+
+def read_label_file(label_path: str) -> ndarray:
+    # Missing and empty label files both mean no objects
+    if not os.path.isfile(label_path) or os.path.getsize(label_path) == 0:
+        return np.zeros((0, 5), dtype=np.float32)
+    with open(label_path, 'r') as f:
+        rows = [line.split() for line in f.read().strip().splitlines() if len(line)]
+    return np.array(rows, dtype=np.float32)
+
+
+def build_cache(root: str) -> str:
+    image_root = os.path.join(root, "images")
+    assert os.path.isdir(image_root), image_root
+
+    print(f"Retrieval {image_root}")
+    return write_cache(image_root, dict())
+
+
+def verify_cache(root: str) -> bool:
+    image_root = os.path.join(root, "images")
+    assert os.path.isdir(image_root), image_root
+    cache_path = cache_path_of(image_root)
+    if not os.path.isfile(cache_path):
+        print(f"Missing {cache_path}")
+        return False
+
+    cache = np.load(cache_path, allow_pickle=True).item()
+    if cache.get('version') != CACHE_VERSION:
+        print(f"Stale: cache version {cache.get('version')}, expected {CACHE_VERSION}")
+        return False
+    im_files = list_images(image_root)
+    if cache.get('hash') != get_hash(img2label_paths(im_files) + im_files):
+        print("Stale: images or labels changed since the cache was written")
+        return False
+    nf, nm, ne, nc, n = cache['results']
+    print(f"Valid {cache_path}: {nf} found, {nm} missing, {ne} empty, {nc} corrupt, {n} total")
+    return True
+
+
+def main(args):
+    if args.command == 'build':
+        build_cache(args.root)
+    else:
+        sys.exit(0 if verify_cache(args.root) else 1)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/19 17:05
+@File    : merge_coco.py
+@Author  : zj
+@Description:
+
+Merge the COCO json files written by sharded `voc2coco.py` runs into one file.
+
+The inputs must be a complete shard set: every `.shard-i-of-K` suffix for i = 0..K-1 exactly once, a missing
+shard would silently give a partial dataset. All shards must have the same categories. Images are sorted by
+`file_name` and annotations keep their order within an image, then annotation ids are reassigned consecutively
+from 0. Image ids are kept when they are unique across shards (VOC image names are), otherwise all images are
+renumbered from 0. For VOC image sets, whose image lists are sorted, the result is the same as a single-node run.
+
+Usage: Merge sharded COCO annotations:
+    $ python3 py/merge_coco.py ../datasets/voc2coco/annotations/instances_val2007.shard-*.json --dst ../datasets/voc2coco/annotations/instances_val2007.json
+
+"""
+from typing import Dict, List
+
+import os
+import json
+import argparse
+import collections
+
+from sharding import parse_shard_suffix
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Merge COCO")
+    parser.add_argument('src', metavar='SRC', type=str, nargs='+',
+                        help='COCO json files of each shard.')
+    parser.add_argument('--dst', metavar='DST', type=str, required=True,
+                        help='Merged COCO json path.')
+    args = parser.parse_args()
+    print("args:", args)
+    return args
+
+
+def sort_shards(path_list: List[str]) -> List[str]:
+    """
+    Sort the shard files by shard index, after checking that they are exactly shards 0..K-1 of one run.
+    """
+    shard_list = [parse_shard_suffix(path) for path in path_list]
+    num_set = {num_shards for num_shards, _ in shard_list}
+    assert len(num_set) == 1, f"Shards of different runs, K = {sorted(num_set)}"
+    num_shards = num_set.pop()
+
+    shard_dict = dict()
+    for path, (_, shard_index) in zip(path_list, shard_list):
+        assert shard_index not in shard_dict, f"Shard {shard_index} given twice: {shard_dict[shard_index]}, {path}"
+        shard_dict[shard_index] = path
+    missing = sorted(set(range(num_shards)) - set(shard_dict.keys()))
+    assert not missing, f"Missing shards {missing} of {num_shards}"
+    return [shard_dict[shard_index] for shard_index in range(num_shards)]
+
+
+def merge(coco_list: List[Dict]) -> Dict:
+    categories = coco_list[0]['categories']
+    for coco_dict in coco_list[1:]:
+        assert coco_dict['categories'] == categories, "Shards have different categories"
+
+    image_list = list()
+    anno_dict = collections.defaultdict(list)
+    for shard_index, coco_dict in enumerate(coco_list):
+        for image_dict in coco_dict['images']:
+            image_list.append((shard_index, image_dict))
+        for anno in coco_dict['annotations']:
+            anno_dict[(shard_index, anno['image_id'])].append(anno)
+    image_list.sort(key=lambda x: x[1]['file_name'])
+
+    file_names = [image_dict['file_name'] for _, image_dict in image_list]
+    assert len(set(file_names)) == len(file_names), "The same image appears in more than one shard"
+    image_ids = [image_dict['id'] for _, image_dict in image_list]
+    renumber = len(set(image_ids)) != len(image_ids)
+    if renumber:
+        print("Image ids collide across shards, renumber images")
+
+    coco_image_list = list()
+    coco_anno_list = list()
+    bbox_id = 0
+    for new_image_id, (shard_index, image_dict) in enumerate(image_list):
+        image_id = new_image_id if renumber else image_dict['id']
+        for anno in anno_dict[(shard_index, image_dict['id'])]:
+            anno = dict(anno)
+            anno['image_id'] = image_id
+            anno['id'] = bbox_id
+            bbox_id += 1
+            coco_anno_list.append(anno)
+
+        image_dict = dict(image_dict)
+        image_dict['id'] = image_id
+        coco_image_list.append(image_dict)
+
+    coco_anno_dict = dict()
+    coco_anno_dict['images'] = coco_image_list
+    coco_anno_dict['annotations'] = coco_anno_list
+    coco_anno_dict['categories'] = categories
+    return coco_anno_dict
+
+
+def main(args):
+    coco_list = list()
+    for src_path in sort_shards(args.src):
+        with open(src_path, 'r') as f:
+            coco_list.append(json.load(f))
+    coco_anno_dict = merge(coco_list)
+    print(f"Merged {len(coco_list)} shards: {len(coco_anno_dict['images'])} images, "
+          f"{len(coco_anno_dict['annotations'])} annotations")
+
+    dst_dir = os.path.dirname(os.path.abspath(args.dst))
+    if not os.path.exists(dst_dir):
+        os.makedirs(dst_dir)
+    with open(args.dst, 'w') as f:
+        json.dump(coco_anno_dict, f)
+    print(f"Save to {args.dst}")
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/21 10:20
+@File    : preprocess.py
+@Author  : zj
+@Description:
+
+Optional image preprocessing stage for the YOLOv5 converters: resize to a maximum side or letterbox to a square
+target size, rescale the labels at the same time and re-encode as JPEG or WebP with a configurable quality.
+
+JPEGs are decoded at reduced size (`cv2.IMREAD_REDUCED_COLOR_2/4/8`) whenever the reduced image is still at least
+as large as the target, which skips most of the decode work for large originals. cv2 releases the GIL, so images
+are processed in a thread pool.
+
+YOLOv5 labels are normalized, so a plain resize keeps them unchanged. Letterbox padding moves and scales them.
+
+Usage:
+    $ python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --max-size 640 --quality 90
+    $ python3 py/voc2yolov5.py -s ../datasets/voc -d ../datasets/voc2yolov5-val -l test-2007 --letterbox 640 --image-format webp
+
+"""
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import io
+import os
+import argparse
+import collections
+from concurrent.futures import Executor
+
+import cv2
+import numpy as np
+from numpy import ndarray
+from PIL import Image
+
+REDUCED_FLAGS = [(8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)]
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+def add_preprocess_args(parser: argparse.ArgumentParser):
+    parser.add_argument('--max-size', metavar='MAX_SIZE', type=int, default=None,
+                        help='Resize images so that the longer side is at most MAX_SIZE.')
+    parser.add_argument('--letterbox', metavar='SIZE', type=int, default=None,
+                        help='Letterbox images to SIZE x SIZE.')
+    parser.add_argument('--image-format', metavar='FORMAT', type=str, default='jpg', choices=['jpg', 'webp'],
+                        help='Encoding of preprocessed images.')
+    parser.add_argument('--quality', metavar='QUALITY', type=int, default=None,
+                        help='JPEG/WebP quality of preprocessed images, re-encode even without resizing.')
+    parser.add_argument('--workers', metavar='WORKERS', type=int, default=os.cpu_count(),
+                        help='Number of threads used to preprocess images.')
+
+
+class Preprocessor:
+
+    def __init__(self, max_size: Optional[int] = None, letterbox: Optional[int] = None,
+                 image_format: str = 'jpg', quality: Optional[int] = None):
+        assert max_size is None or letterbox is None, "Use either max_size or letterbox"
+        assert image_format in ('jpg', 'webp'), image_format
+        self.max_size = max_size
+        self.letterbox = letterbox
+        self.image_format = image_format
+        self.quality = 95 if quality is None else quality
+
+    @property
+    def target_size(self) -> Optional[int]:
+        return self.letterbox if self.letterbox is not None else self.max_size
+
+    def load(self, image_path: str, data: Optional[bytes] = None) -> ndarray:
+        """
+        Decode `image_path`, or `data` if its bytes were already read.
+        """
+        def decode(flag: int) -> ndarray:
+            if data is None:
+                image = cv2.imread(image_path, flag)
+            else:
+                image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+            assert image is not None, image_path
+            return image
+
+        target_size = self.target_size
+        if target_size is not None and image_path.lower().endswith(('.jpg', '.jpeg')):
+            # Only the header is read here
+            with Image.open(image_path if data is None else io.BytesIO(data)) as image:
+                img_w, img_h = image.size
+            for factor, flag in REDUCED_FLAGS:
+                if max(img_w, img_h) // factor >= target_size:
+                    return decode(flag)
+        return decode(cv2.IMREAD_COLOR)
+
+    def resize(self, image: ndarray, labels: ndarray) -> Tuple[ndarray, ndarray]:
+        img_h, img_w = image.shape[:2]
+        target_size = self.target_size
+        if target_size is None:
+            return image, labels
+
+        scale = target_size / max(img_h, img_w)
+        if self.letterbox is None and scale >= 1:
+            # Never upscale with max_size
+            return image, labels
+        new_w, new_h = max(1, round(img_w * scale)), max(1, round(img_h * scale))
+        if (new_w, new_h) != (img_w, img_h):
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            image = cv2.resize(image, (new_w, new_h), interpolation=interpolation)
+        if self.letterbox is None:
+            return image, labels
+
+        size = self.letterbox
+        pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+        image = cv2.copyMakeBorder(image, pad_y, size - new_h - pad_y, pad_x, size - new_w - pad_x,
+                                   cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+        labels = np.array(labels, dtype=np.float64).reshape(-1, 5)
+        labels[:, 1] = (labels[:, 1] * new_w + pad_x) / size
+        labels[:, 2] = (labels[:, 2] * new_h + pad_y) / size
+        labels[:, 3] = labels[:, 3] * new_w / size
+        labels[:, 4] = labels[:, 4] * new_h / size
+        return image, labels
+
+    def encode_params(self) -> List[int]:
+        if self.image_format == 'webp':
+            return [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        return [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+
+    def encode(self, image: ndarray, dst_path: str):
+        assert cv2.imwrite(dst_path, image, self.encode_params()), dst_path
+
+    def encode_bytes(self, image: ndarray) -> bytes:
+        ok, data = cv2.imencode('.' + self.image_format, image, self.encode_params())
+        assert ok
+        return data.tobytes()
+
+    def dst_name(self, image_name: str) -> str:
+        return os.path.splitext(image_name)[0] + '.' + self.image_format
+
+    def __call__(self, image_path: str, dst_image_root: str, labels: ndarray) -> Tuple[str, Tuple[int, int], ndarray]:
+        """
+        Preprocess one image and its normalized YOLOv5 labels, return (dst_image_path, (width, height), labels).
+        """
+        image, labels = self.resize(self.load(image_path), labels)
+        dst_image_path = os.path.join(dst_image_root, self.dst_name(os.path.basename(image_path)))
+        self.encode(image, dst_image_path)
+        img_h, img_w = image.shape[:2]
+        return dst_image_path, (img_w, img_h), labels
+
+    def to_bytes(self, image_path: str, labels: ndarray,
+                 data: Optional[bytes] = None) -> Tuple[bytes, Tuple[int, int], ndarray]:
+        """
+        Like `__call__`, but return the encoded image instead of writing it, e.g. to pack it into a tar shard.
+        """
+        image, labels = self.resize(self.load(image_path, data), labels)
+        img_h, img_w = image.shape[:2]
+        return self.encode_bytes(image), (img_w, img_h), labels
+
+
+def bounded_map(executor: Executor, fn: Callable, iterable: Iterable, max_pending: int) -> Iterator:
+    """
+    Like `executor.map`, but keeps at most `max_pending` tasks in flight so a lazy iterable is not read up front.
+    """
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def build_preprocessor(args) -> Optional[Preprocessor]:
+    if args.max_size is None and args.letterbox is None and args.quality is None and args.image_format == 'jpg':
+        return None
+    return Preprocessor(max_size=args.max_size, letterbox=args.letterbox,
+                        image_format=args.image_format, quality=args.quality)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/20 15:10
+@File    : segmentation.py
+@Author  : zj
+@Description:
+
+Encode Pascal VOC `SegmentationObject` masks as COCO RLE or polygons.
+
+`SegmentationObject/xxx.png` is a palette PNG, pixel value `k` belongs to the k-th object of `Annotations/xxx.xml`,
+0 is background and 255 is the void border. All instances of an image are encoded in one pass: the mask is flattened
+in column-major order (as COCO RLE expects), split into runs once, and the runs of every instance are turned into
+counts with NumPy.
+
+Usage:
+    >>> from segmentation import encode_mask_file
+    >>> result = encode_mask_file(('VOCdevkit/VOC2012/SegmentationObject/2007_000032.png', 'rle'))
+    >>> result[1]['area'], result[1]['segmentation']['counts']
+
+"""
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+from numpy import ndarray
+from PIL import Image
+
+VOID = 255
+
+
+def load_instance_mask(mask_path: str) -> ndarray:
+    with Image.open(mask_path) as mask:
+        # Palette indices, not RGB colors
+        assert mask.mode in ('P', 'L'), f"{mask_path} is not a palette PNG"
+        return np.asarray(mask, dtype=np.uint8)
+
+
+def rle_runs(label_map: ndarray) -> Tuple[ndarray, ndarray, ndarray]:
+    """
+    Split a label map in column-major order into runs of equal value, return (values, starts, lengths).
+    """
+    pixels = label_map.ravel(order='F')
+    starts = np.concatenate([[0], np.flatnonzero(pixels[1:] != pixels[:-1]) + 1])
+    lengths = np.diff(np.append(starts, pixels.size))
+    return pixels[starts], starts, lengths
+
+
+def instance_counts(values: ndarray, starts: ndarray, lengths: ndarray, instance_id: int, num_pixels: int) -> ndarray:
+    """
+    COCO RLE counts of one instance: alternating lengths of background and foreground, starting with background.
+    """
+    keep = values == instance_id
+    fg_starts = starts[keep]
+    fg_lengths = lengths[keep]
+    if len(fg_starts) == 0:
+        return np.array([num_pixels], dtype=np.int64)
+
+    fg_ends = fg_starts + fg_lengths
+    # Everything between two runs of the instance counts as background, including other instances
+    bg_lengths = fg_starts - np.concatenate([[0], fg_ends[:-1]])
+    counts = np.empty(2 * len(fg_starts) + 1, dtype=np.int64)
+    counts[0:-1:2] = bg_lengths
+    counts[1::2] = fg_lengths
+    counts[-1] = num_pixels - fg_ends[-1]
+    if counts[-1] == 0:
+        counts = counts[:-1]
+    return counts
+
+
+def rle_to_string(counts: ndarray) -> str:
+    """
+    Compress RLE counts to the COCO string format, the same as `rleToString` in pycocotools.
+    """
+    counts = [int(x) for x in counts]
+    chars = list()
+    for i, x in enumerate(counts):
+        if i > 2:
+            x -= counts[i - 2]
+        more = True
+        while more:
+            c = x & 0x1f
+            x >>= 5
+            more = (x != -1) if (c & 0x10) else (x != 0)
+            if more:
+                c |= 0x20
+            chars.append(chr(c + 48))
+    return ''.join(chars)
+
+
+def mask_to_polygons(mask: ndarray) -> List[List[float]]:
+    contours, _ = cv2.findContours(mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # A polygon needs at least 3 points
+    return [contour.ravel().astype(float).tolist() for contour in contours if len(contour) >= 3]
+
+
+def encode_instances(label_map: ndarray, mode: str = 'rle') -> Dict[int, Dict]:
+    """
+    Encode every instance of a label map, return {instance_id: {'segmentation': ..., 'area': ...}}.
+    """
+    assert mode in ('rle', 'polygon'), mode
+    img_h, img_w = label_map.shape
+    values, starts, lengths = rle_runs(label_map)
+    areas = np.bincount(values, weights=lengths, minlength=VOID + 1)
+
+    result = dict()
+    for instance_id in np.unique(values):
+        if instance_id == 0 or instance_id == VOID:
+            continue
+        if mode == 'rle':
+            counts = instance_counts(values, starts, lengths, instance_id, label_map.size)
+            segmentation = {'size': [img_h, img_w], 'counts': rle_to_string(counts)}
+        else:
+            segmentation = mask_to_polygons(label_map == instance_id)
+        result[int(instance_id)] = {'segmentation': segmentation, 'area': float(areas[instance_id])}
+    return result
+
+
+def encode_mask_file(item: Tuple[str, str]) -> Dict[int, Dict]:
+    # Worker entry, takes a single tuple so it can be used with Pool.imap
+    mask_path, mode = item
+    return encode_instances(load_instance_mask(mask_path), mode)
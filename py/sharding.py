@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/19 16:40
+@File    : sharding.py
+@Author  : zj
+@Description:
+
+Deterministic hash-based partitioning of dataset items over `--num-shards K --shard-index i`.
+
+An item belongs to shard `md5(image name) % K`. The image name (file name without suffix) is used as key, so the
+partition does not depend on the data root, the machine or the order in which files are listed.
+
+Each converter accepts `--num-shards` and `--shard-index`, so every shard can run on its own node. For testing,
+all shards can also be launched as local processes:
+
+Usage: Run 4 shards of a converter as local processes:
+    $ python3 py/sharding.py 4 -- python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/
+    $ python3 py/sharding.py 4 -- python3 py/voc2coco.py -v ../datasets/voc -c ../datasets/voc2coco -l val-2007
+
+The COCO json of each shard is then combined with `py/merge_coco.py`.
+
+"""
+from typing import List, Tuple
+
+import os
+import re
+import sys
+import hashlib
+import argparse
+import subprocess
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sharding")
+    parser.add_argument('num_shards', metavar='NUM_SHARDS', type=int,
+                        help='Number of shards.')
+    parser.add_argument('command', metavar='COMMAND', nargs=argparse.REMAINDER,
+                        help='Converter command, `--num-shards` and `--shard-index` are appended for each shard.')
+    args = parser.parse_args()
+    print("args:", args)
+    return args
+
+
+def add_shard_args(parser: argparse.ArgumentParser):
+    parser.add_argument('--num-shards', metavar='NUM_SHARDS', type=int, default=1,
+                        help='Number of shards the items are partitioned into.')
+    parser.add_argument('--shard-index', metavar='SHARD_INDEX', type=int, default=0,
+                        help='Index of the shard processed by this run.')
+
+
+def shard_of(path: str, num_shards: int) -> int:
+    # Python's hash() is salted per process, md5 gives the same result on every node
+    key = os.path.splitext(os.path.basename(str(path)))[0]
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'little') % num_shards
+
+
+def in_shard(path: str, num_shards: int = 1, shard_index: int = 0) -> bool:
+    assert 0 <= shard_index < num_shards, f"Invalid shard {shard_index} of {num_shards}"
+    return num_shards == 1 or shard_of(path, num_shards) == shard_index
+
+
+def shard_suffix(num_shards: int = 1, shard_index: int = 0) -> str:
+    return '' if num_shards == 1 else f".shard-{shard_index}-of-{num_shards}"
+
+
+def parse_shard_suffix(path: str) -> Tuple[int, int]:
+    """
+    (num_shards, shard_index) of a file named with `shard_suffix`, e.g. `instances_val2007.shard-1-of-4.json`.
+    """
+    match_list = re.findall(r'\.shard-(\d+)-of-(\d+)', os.path.basename(path))
+    assert match_list, f"{path} has no .shard-i-of-K suffix"
+    shard_index, num_shards = map(int, match_list[-1])
+    assert 0 <= shard_index < num_shards, f"Invalid shard {shard_index} of {num_shards} in {path}"
+    return num_shards, shard_index
+
+
+def launch_local(command: List[str], num_shards: int) -> int:
+    process_list = list()
+    for shard_index in range(num_shards):
+        shard_command = command + ['--num-shards', str(num_shards), '--shard-index', str(shard_index)]
+        print(f"Launch shard {shard_index}: {' '.join(shard_command)}")
+        process_list.append(subprocess.Popen(shard_command))
+
+    return_code = 0
+    for shard_index, process in enumerate(process_list):
+        code = process.wait()
+        if code != 0:
+            print(f"Shard {shard_index} failed with exit code {code}")
+            return_code = code
+    return return_code
+
+
+def main(args):
+    command = args.command
+    if command and command[0] == '--':
+        command = command[1:]
+    assert len(command) > 0, "Please provide the converter command"
+    sys.exit(launch_local(command, args.num_shards))
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -18,6 +18,9 @@ Usage: Save annotated image:
     $ python3 py/show_voclike_label.py assets/voclike/000006.jpg assets/voclike/000006.xml --dst ./output/
     $ python3 py/show_voclike_label.py assets/voclike/ assets/voclike/ --dst ./output/
 
+Usage: Read the next images ahead and save asynchronously, e.g. on network storage:
+    $ python3 py/show_voclike_label.py /mnt/nfs/voclike/ /mnt/nfs/voclike/ --dst ./output/ --io-concurrency 8
+
 """
 import glob
 from typing import Dict, List, Any
@@ -27,8 +30,11 @@ import argparse
 import collections
 
 import cv2
+import numpy as np
 import xml.etree.ElementTree as ET
 
+from async_io import add_io_args, build_io
+
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Show VOCLike label")
@@ -39,6 +45,7 @@ def parse_args():
 
     parser.add_argument('--dst', metavar='DST', type=str, default=None,
                         help='Save data dir.')
+    add_io_args(parser)
     args = parser.parse_args()
     print("args:", args)
     return args
@@ -82,14 +89,27 @@ def main(args):
     else:
         raise ValueError("Please provide correct args.image and args.label")
 
+    aio = build_io(args)
+    if aio is None:
+        items = (((image_path, label_path), (None, None)) for image_path, label_path in zip(image_list, label_list))
+    else:
+        # The next images and labels are read while the current one is shown
+        items = aio.read_ahead(zip(image_list, label_list), lambda pair: pair)
+
     dst_dir = args.dst
-    for image_path, label_path in zip(image_list, label_list):
+    for (image_path, label_path), (image_data, label_data) in items:
         # Image
-        assert os.path.isfile(image_path), image_path
-        image = cv2.imread(image_path)
+        if image_data is None:
+            assert os.path.isfile(image_path), image_path
+            image = cv2.imread(image_path)
+        else:
+            image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
         # Label
-        assert os.path.isfile(label_path), label_path
-        target = parse_voc_xml(ET.parse(label_path).getroot())
+        if label_data is None:
+            assert os.path.isfile(label_path), label_path
+            target = parse_voc_xml(ET.parse(label_path).getroot())
+        else:
+            target = parse_voc_xml(ET.fromstring(label_data))
         print(target)
 
         for object in target['annotation']['object']:
@@ -115,8 +135,13 @@ def main(args):
             image_name = os.path.basename(image_path)
             dst_image_path = os.path.join(dst_dir, image_name)
 
-            cv2.imwrite(dst_image_path, image)
+            if aio is None:
+                cv2.imwrite(dst_image_path, image)
+            else:
+                aio.write(dst_image_path, cv2.imencode(os.path.splitext(image_name)[1], image)[1].tobytes())
             print(f"Save to {dst_image_path}")
+    if aio is not None:
+        aio.close()
 
 
 if __name__ == '__main__':
@@ -18,9 +18,12 @@ Usage: Save annotated image:
     $ python3 py/show_yololike_label.py assets/yololike/000000082986.jpg assets/yololike/000000082986.txt --dst ./output/
     $ python3 py/show_yololike_label.py assets/yololike/ assets/yololike/ --dst ./output/
 
+Usage: Read the next images ahead and save asynchronously, e.g. on network storage:
+    $ python3 py/show_yololike_label.py /mnt/nfs/yololike/ /mnt/nfs/yololike/ --dst ./output/ --io-concurrency 8
+
 """
 
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 
 import os
 import glob
@@ -31,6 +34,8 @@ import cv2
 import numpy as np
 from numpy import ndarray
 
+from async_io import add_io_args, build_io
+
 
 def parse_args() -> Namespace:
     parser = argparse.ArgumentParser(description="Show YOLOLike label")
@@ -41,29 +46,40 @@ def parse_args() -> Namespace:
 
     parser.add_argument('--dst', metavar='DST', type=str, default=None,
                         help='Save data dir.')
+    add_io_args(parser)
     args = parser.parse_args()
     print("args:", args)
     return args
 
 
-def parse_yolo_txt(label_path: str) -> List:
+def parse_yolo_txt(label_path: str, data: Optional[bytes] = None) -> List:
+    if data is None:
+        with open(label_path, 'r') as f:
+            lines = f.readlines()
+    else:
+        lines = data.decode().splitlines()
+
     target = []
-    with open(label_path, 'r') as f:
-        for line in f.readlines():
-            items = line.strip().split(' ')
-            assert len(items) > 5, label_path
+    for line in lines:
+        items = line.strip().split(' ')
+        assert len(items) > 5, label_path
 
-            target.append(np.array(items, dtype=float))
+        target.append(np.array(items, dtype=float))
     return target
 
 
-def show_image_label(image_path: str, label_path: str) -> Tuple[ndarray, str]:
+def show_image_label(image_path: str, label_path: str,
+                     image_data: Optional[bytes] = None, label_data: Optional[bytes] = None) -> Tuple[ndarray, str]:
     # Image
-    assert os.path.isfile(image_path), image_path
-    image = cv2.imread(image_path)
+    if image_data is None:
+        assert os.path.isfile(image_path), image_path
+        image = cv2.imread(image_path)
+    else:
+        image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
     # Label
-    assert os.path.isfile(label_path), label_path
-    target = parse_yolo_txt(label_path)
+    if label_data is None:
+        assert os.path.isfile(label_path), label_path
+    target = parse_yolo_txt(label_path, label_data)
 
     image_h, image_w = image.shape[:2]
     for items in target:
@@ -101,9 +117,16 @@ def main(args: Namespace):
     else:
         raise ValueError("Please provide correct args.image and args.label")
 
+    aio = build_io(args)
+    if aio is None:
+        items = (((image_path, label_path), (None, None)) for image_path, label_path in zip(image_list, label_list))
+    else:
+        # The next images and labels are read while the current one is shown
+        items = aio.read_ahead(zip(image_list, label_list), lambda pair: pair)
+
     dst_dir = args.dst
-    for image_path, label_path in zip(image_list, label_list):
-        image, image_name = show_image_label(image_path, label_path)
+    for (image_path, label_path), (image_data, label_data) in items:
+        image, image_name = show_image_label(image_path, label_path, image_data, label_data)
 
         cv2.imshow("image", image)
         cv2.waitKey(0)
@@ -115,8 +138,13 @@ def main(args: Namespace):
 
             dst_image_path = os.path.join(dst_dir, image_name)
 
-            cv2.imwrite(dst_image_path, image)
+            if aio is None:
+                cv2.imwrite(dst_image_path, image)
+            else:
+                aio.write(dst_image_path, cv2.imencode(os.path.splitext(image_name)[1], image)[1].tobytes())
             print(f"Save to {dst_image_path}")
+    if aio is not None:
+        aio.close()
 
 
 if __name__ == '__main__':
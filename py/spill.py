@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/23 16:20
+@File    : spill.py
+@Author  : zj
+@Description:
+
+Memory-bounded mode for very large conversions.
+
+`--max-memory MB` is for converters that collect annotation tables (e.g. the COCO `images` and `annotations` lists
+of `py/voc2coco.py`). The tables are kept as `SpillList`: items are stored as JSON lines, and once the buffered
+lines exceed their share of MB they are written to a chunk file on disk. At the end the chunks are merged in order
+straight into the output json with `dump_json_lists`, so the full table is never held in memory. Discovery is
+streamed as well, files are processed as found.
+
+`--stream` is for converters that keep nothing per image anyway: directories are read lazily in filesystem order
+and nothing else is collected, so memory stays constant.
+
+Peak RSS is reported at the end of a run, so the budget can be checked on a sample before a full run. MB only
+bounds the annotation tables, not the interpreter, libraries and decoded images.
+
+Usage:
+    $ python3 py/voc2coco.py -v ../datasets/voc -c ../datasets/voc2coco -l train-2012 --max-memory 512
+    $ python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --stream
+    $ python3 py/find_classes.py assets/voclike --stream
+
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import resource
+import tempfile
+
+
+def add_memory_args(parser: argparse.ArgumentParser):
+    parser.add_argument('--max-memory', metavar='MB', type=int, default=None,
+                        help='Memory-bounded mode: keep at most about MB megabytes of annotation tables in memory, '
+                             'the rest is spilled to disk.')
+
+
+def add_stream_args(parser: argparse.ArgumentParser):
+    parser.add_argument('--stream', action='store_true', default=False,
+                        help='Read directories lazily in filesystem order and keep nothing per image in memory.')
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1024 / 1024 if sys.platform == 'darwin' else peak_rss / 1024
+
+
+def report_peak_rss(max_memory: Optional[int] = None):
+    peak_rss = peak_rss_mb()
+    print(f"Peak RSS: {peak_rss:.1f} MB")
+    if max_memory is not None and peak_rss > max_memory:
+        # The budget only covers annotation tables, not the interpreter, libraries and decoded images
+        print(f"Peak RSS exceeds --max-memory {max_memory} MB, lower it or use more shards")
+
+
+class SpillList:
+    """
+    Append-only list of JSON-serializable items, spilled to `<spill_dir>/chunk-000000.jsonl`, ... in chunks of
+    about `max_bytes`. Iteration returns the items in insertion order.
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None):
+        assert max_bytes > 0, max_bytes
+        self.max_bytes = max_bytes
+        self.spill_dir = tempfile.mkdtemp(prefix='spill-', dir=spill_dir)
+        self.chunk_list: List[str] = list()
+        self.buffer: List[str] = list()
+        self.buffer_bytes = 0
+        self.num = 0
+
+    def append(self, item: Any):
+        line = json.dumps(item)
+        self.buffer.append(line)
+        self.buffer_bytes += len(line)
+        self.num += 1
+        if self.buffer_bytes >= self.max_bytes:
+            self.spill()
+
+    def spill(self):
+        if not self.buffer:
+            return
+        chunk_path = os.path.join(self.spill_dir, f"chunk-{len(self.chunk_list):06d}.jsonl")
+        with open(chunk_path, 'w') as f:
+            f.writelines(line + '\n' for line in self.buffer)
+        self.chunk_list.append(chunk_path)
+        self.buffer = list()
+        self.buffer_bytes = 0
+
+    def iter_json(self) -> Iterator[str]:
+        """
+        Iterate the serialized items without parsing them.
+        """
+        for chunk_path in self.chunk_list:
+            with open(chunk_path, 'r') as f:
+                for line in f:
+                    yield line.rstrip('\n')
+        yield from self.buffer
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(json.loads, self.iter_json())
+
+    def __len__(self) -> int:
+        return self.num
+
+    def close(self):
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+        self.chunk_list = list()
+        self.buffer = list()
+
+
+def new_table(max_bytes: Optional[int], spill_dir: Optional[str] = None) -> Union[List, SpillList]:
+    """
+    A plain list, or a SpillList in memory-bounded mode.
+    """
+    return list() if max_bytes is None else SpillList(max_bytes, spill_dir=spill_dir)
+
+
+def dump_json_lists(json_path: str, table_dict: Dict[str, Iterable]):
+    """
+    Write {key: table} as one json object, item by item. The result is the same as `json.dump` of a dict of lists.
+    """
+    with open(json_path, 'w') as f:
+        f.write('{')
+        for i, (key, table) in enumerate(table_dict.items()):
+            f.write(', ' if i > 0 else '')
+            f.write(json.dumps(key) + ': [')
+            lines = table.iter_json() if isinstance(table, SpillList) else map(json.dumps, table)
+            for j, line in enumerate(lines):
+                f.write(', ' if j > 0 else '')
+                f.write(line)
+            f.write(']')
+        f.write('}')
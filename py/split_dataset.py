@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/19 14:35
+@File    : split_dataset.py
+@Author  : zj
+@Description:
+
+Split VOCLike or YOLOv5 data into train/val/test from annotation metadata, without copying images.
+
+Three strategies are supported:
+    random:     shuffle all images
+    stratified: bucket every image by its rarest class, then split each bucket with the same ratios, the split
+                sizes are the same as for random
+    group:      keep all images that share a filename prefix (text before `--group-sep`) in the same split
+
+The result is written as VOC `ImageSets/Main/<split>.txt` (image ids) and YOLOv5 `<split>.txt` (image paths).
+With `--link hard` or `--link sym` a directory tree per split is built from links, so no image is copied.
+
+Only the stratified strategy reads the labels. Random and group splits only list file names.
+
+Usage: Split VOCLike data:
+    $ python3 py/split_dataset.py assets/voclike ./output/split/ --ratios 0.8 0.2
+    $ python3 py/split_dataset.py assets/voclike ./output/split/ --ratios 0.8 0.1 0.1 --strategy stratified --link hard
+
+Usage: Split YOLOv5 data:
+    $ python3 py/split_dataset.py /path/to/yolov5_data/ ./output/split/ --format yolo --strategy group --group-sep _
+
+For a VOCLike dataset with `--link`, the save structure is as follows:
+
+    split/
+        ImageSets/Main/
+            train.txt
+            val.txt
+        train.txt
+        val.txt
+        train/
+            aaaa.jpg
+            aaaa.xml
+        val/
+            bbbb.jpg
+            bbbb.xml
+
+For a YOLOv5 dataset the split trees contain `images/` and `labels/` instead.
+
+"""
+from typing import Dict, List, Tuple
+
+import os
+import argparse
+import collections
+from multiprocessing import Pool
+
+import numpy as np
+import xml.etree.ElementTree as ET
+
+SPLIT_NAMES = ['train', 'val', 'test']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Split Dataset")
+    parser.add_argument('src', metavar='SRC', type=str,
+                        help='VOCLike label dir or YOLOv5 data root path.')
+    parser.add_argument('dst', metavar='DST', type=str,
+                        help='Save data dir.')
+
+    parser.add_argument('--format', metavar='FORMAT', type=str, default='voclike', choices=['voclike', 'yolo'],
+                        help='Dataset format.')
+    parser.add_argument('--image', metavar='IMAGE', type=str, default=None,
+                        help='VOCLike image dir, default is the same as SRC.')
+    parser.add_argument('--ratios', metavar='RATIOS', type=float, nargs='+', default=[0.8, 0.2],
+                        help='Ratios of train/val(/test).')
+    parser.add_argument('--strategy', metavar='STRATEGY', type=str, default='random',
+                        choices=['random', 'stratified', 'group'],
+                        help='Split strategy.')
+    parser.add_argument('--group-sep', metavar='SEP', type=str, default='_',
+                        help='Images whose name shares the text before SEP are kept in the same split.')
+    parser.add_argument('--link', metavar='LINK', type=str, default=None, choices=['hard', 'sym'],
+                        help='Build split directory trees from hardlinks or symlinks.')
+    parser.add_argument('--seed', metavar='SEED', type=int, default=0,
+                        help='Random seed.')
+    parser.add_argument('--workers', metavar='WORKERS', type=int, default=os.cpu_count(),
+                        help='Number of processes used to read labels.')
+    args = parser.parse_args()
+    print("args:", args)
+    return args
+
+
+def list_files(root: str, suffix: str) -> List[str]:
+    path_list = list()
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            if file_name.endswith(suffix):
+                path_list.append(os.path.join(dir_path, file_name))
+    return sorted(path_list)
+
+
+def load_voclike_items(image_dir: str, label_dir: str) -> Tuple[List[str], List[str]]:
+    assert os.path.isdir(image_dir) and os.path.isdir(label_dir), "Image and label directories must exist"
+
+    # One directory listing instead of a stat call per image
+    image_set = set(list_files(image_dir, ".jpg"))
+    image_list = list()
+    label_list = list()
+    print(f"Retrieval {label_dir}")
+    for xml_path in list_files(label_dir, ".xml"):
+        image_path = xml_path.replace(label_dir, image_dir).replace(".xml", ".jpg")
+        if image_path in image_set:
+            image_list.append(image_path)
+            label_list.append(xml_path)
+    return image_list, label_list
+
+
+def load_yolo_items(root: str) -> Tuple[List[str], List[str]]:
+    image_root = os.path.join(root, "images")
+    assert os.path.isdir(image_root), image_root
+    label_root = os.path.join(root, "labels")
+    assert os.path.isdir(label_root), label_root
+
+    image_set = set(list_files(image_root, ".jpg"))
+    image_list = list()
+    label_list = list()
+    print(f"Retrieval {label_root}")
+    for label_path in list_files(label_root, ".txt"):
+        image_path = label_path.replace(label_root, image_root).replace(".txt", ".jpg")
+        if image_path in image_set:
+            image_list.append(image_path)
+            label_list.append(label_path)
+    return image_list, label_list
+
+
+def read_voclike_classes(xml_path: str) -> List[str]:
+    # Only the object names are needed, so skip building the full annotation dict
+    names = list()
+    for _, elem in ET.iterparse(xml_path):
+        if elem.tag == 'object':
+            name = elem.find('name')
+            if name is not None and name.text:
+                names.append(name.text.strip())
+    return names
+
+
+def read_yolo_classes(label_path: str) -> List[str]:
+    names = list()
+    with open(label_path, 'r') as f:
+        for line in f:
+            items = line.split(maxsplit=1)
+            if items:
+                names.append(str(int(float(items[0]))))
+    return names
+
+
+def split_counts(num: int, ratios: np.ndarray) -> np.ndarray:
+    counts = np.floor(num * ratios).astype(int)
+    # Hand out the remainder to the largest fractional parts
+    remainder = num - counts.sum()
+    if remainder > 0:
+        order = np.argsort(-(num * ratios - counts), kind='stable')
+        counts[order[:remainder]] += 1
+    return counts
+
+
+def cut_order(order: np.ndarray, ratios: np.ndarray) -> np.ndarray:
+    """
+    Assign the images in `order` to the splits in turn, with the sizes of `split_counts`.
+    """
+    split_ids = np.empty(len(order), dtype=int)
+    bounds = np.cumsum(split_counts(len(order), ratios))[:-1]
+    for split_id, part in enumerate(np.split(order, bounds)):
+        split_ids[part] = split_id
+    return split_ids
+
+
+def random_split(num: int, ratios: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    return cut_order(rng.permutation(num), ratios)
+
+
+def stratified_split(class_lists: List[List[str]], ratios: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    frequency = collections.Counter()
+    for names in class_lists:
+        frequency.update(set(names))
+
+    # Bucket each image by its rarest class, images without objects share one bucket
+    buckets: Dict[str, List[int]] = collections.defaultdict(list)
+    for idx, names in enumerate(class_lists):
+        key = min(set(names), key=lambda x: (frequency[x], x)) if names else ''
+        buckets[key].append(idx)
+
+    # Spread every bucket evenly over [0, 1) with a random offset, then cut one order sorted by that rank against
+    # the global sizes. Each bucket follows the ratios, and a bucket of one or two images is not always put in train
+    ranks = np.empty(len(class_lists), dtype=float)
+    for key in sorted(buckets.keys()):
+        indices = rng.permutation(buckets[key])
+        ranks[indices] = (np.arange(len(indices)) + rng.random()) / len(indices)
+    order = np.lexsort((rng.random(len(class_lists)), ranks))
+    return cut_order(order, ratios)
+
+
+def group_split(image_list: List[str], ratios: np.ndarray, sep: str, rng: np.random.Generator) -> np.ndarray:
+    keys = [os.path.basename(image_path).split(sep, 1)[0] for image_path in image_list]
+    group_names, group_ids = np.unique(np.array(keys), return_inverse=True)
+    group_sizes = np.bincount(group_ids)
+
+    # Fill the splits in order with shuffled groups until each reaches its target size
+    targets = np.cumsum(ratios) * len(image_list)
+    group_split_ids = np.empty(len(group_names), dtype=int)
+    split_id = 0
+    total = 0
+    for group_id in rng.permutation(len(group_names)):
+        while split_id < len(ratios) - 1 and total >= targets[split_id]:
+            split_id += 1
+        group_split_ids[group_id] = split_id
+        total += group_sizes[group_id]
+    return group_split_ids[group_ids]
+
+
+def make_link(src_path: str, dst_path: str, link: str):
+    if os.path.lexists(dst_path):
+        os.remove(dst_path)
+    if link == 'hard':
+        os.link(src_path, dst_path)
+    else:
+        os.symlink(os.path.abspath(src_path), dst_path)
+
+
+def main(args):
+    if args.format == 'voclike':
+        image_dir = args.src if args.image is None else args.image
+        image_list, label_list = load_voclike_items(image_dir, args.src)
+        read_classes = read_voclike_classes
+    else:
+        image_list, label_list = load_yolo_items(args.src)
+        read_classes = read_yolo_classes
+    print(f"Found {len(image_list)} images")
+
+    assert 1 < len(args.ratios) <= len(SPLIT_NAMES), args.ratios
+    ratios = np.array(args.ratios, dtype=float)
+    ratios = ratios / ratios.sum()
+    split_names = SPLIT_NAMES[:len(ratios)]
+    rng = np.random.default_rng(args.seed)
+
+    if args.strategy == 'random':
+        split_ids = random_split(len(image_list), ratios, rng)
+    elif args.strategy == 'group':
+        split_ids = group_split(image_list, ratios, args.group_sep, rng)
+    else:
+        with Pool(args.workers) as pool:
+            class_lists = pool.map(read_classes, label_list, chunksize=256)
+        split_ids = stratified_split(class_lists, ratios, rng)
+
+    save_root = args.dst
+    image_set_root = os.path.join(save_root, "ImageSets", "Main")
+    if not os.path.exists(image_set_root):
+        os.makedirs(image_set_root)
+    for split_id, split_name in enumerate(split_names):
+        indices = np.flatnonzero(split_ids == split_id)
+        print(f"{split_name}: {len(indices)}")
+
+        image_set_path = os.path.join(image_set_root, f"{split_name}.txt")
+        with open(image_set_path, 'w') as f:
+            f.writelines(os.path.splitext(os.path.basename(image_list[i]))[0] + '\n' for i in indices)
+        yolo_list_path = os.path.join(save_root, f"{split_name}.txt")
+        with open(yolo_list_path, 'w') as f:
+            f.writelines(os.path.abspath(image_list[i]) + '\n' for i in indices)
+
+        if args.link is None:
+            continue
+        if args.format == 'voclike':
+            dst_image_root = dst_label_root = os.path.join(save_root, split_name)
+        else:
+            dst_image_root = os.path.join(save_root, split_name, "images")
+            dst_label_root = os.path.join(save_root, split_name, "labels")
+        for dst_dir in {dst_image_root, dst_label_root}:
+            if not os.path.exists(dst_dir):
+                os.makedirs(dst_dir)
+        for i in indices:
+            make_link(image_list[i], os.path.join(dst_image_root, os.path.basename(image_list[i])), args.link)
+            make_link(label_list[i], os.path.join(dst_label_root, os.path.basename(label_list[i])), args.link)
+
+    print(f"Save to {save_root}")
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
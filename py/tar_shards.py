@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/23 10:15
+@File    : tar_shards.py
+@Author  : zj
+@Description:
+
+Pack samples into fixed-size tar shards (WebDataset-style) instead of many small files.
+
+All files of one sample share a key and are stored next to each other, e.g. `000043.jpg` + `000043.txt`.
+A shard is closed once it reaches `max_bytes`. Every shard `xxx-000000.tar` gets an index sidecar
+`xxx-000000.idx.json` with the byte offset and size of each member, so a sample can be read directly from a
+memory-mapped shard without scanning the tar:
+
+    {"shard": "xxx-000000.tar", "samples": [{"key": "000043", "members": {"jpg": [offset, size], ...}}, ...]}
+
+Training reads shards sequentially with `TarShardDataset` or randomly with `TarShardIndex` in `py/dataset.py`.
+
+Usage:
+    $ python py/voc2yolov5.py -s ../datasets/voc -d ../datasets/voc2yolov5-train -l trainval-2007 --tar-shards 1024
+    $ python py/voc2coco.py -v ../datasets/voc -c ../datasets/voc2coco -l val-2007 --tar-shards 1024
+
+"""
+from typing import Dict, List, Optional
+
+import io
+import os
+import json
+import tarfile
+import argparse
+
+import numpy as np
+
+SHARD_PATTERN = "{prefix}-{index:06d}.tar"
+
+
+def add_tar_shard_args(parser: argparse.ArgumentParser):
+    parser.add_argument('--tar-shards', metavar='MB', type=int, default=None,
+                        help='Pack images and labels into tar shards of about MB megabytes instead of single files.')
+
+
+def labels_to_bytes(labels) -> bytes:
+    # Same text as np.savetxt(label_path, labels, fmt='%f', delimiter=' ')
+    buffer = io.BytesIO()
+    np.savetxt(buffer, np.asarray(labels, dtype=np.float64).reshape(-1, 5), fmt='%f', delimiter=' ')
+    return buffer.getvalue()
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def index_path_of(shard_path: str) -> str:
+    return shard_path[:-len('.tar')] + '.idx.json'
+
+
+def build_index(shard_path: str) -> Dict:
+    """
+    Collect member offsets of a shard, only the tar headers are read.
+    """
+    samples: List[Dict] = list()
+    with tarfile.open(shard_path, 'r:') as tar:
+        for member in tar.getmembers():
+            if not member.isfile():
+                continue
+            name = os.path.basename(member.name)
+            key, ext = name.split('.', 1)
+            if not samples or samples[-1]['key'] != key:
+                samples.append({'key': key, 'members': dict()})
+            samples[-1]['members'][ext] = [member.offset_data, member.size]
+    return {'shard': os.path.basename(shard_path), 'samples': samples}
+
+
+class ShardWriter:
+    """
+    Write samples to `<dst_dir>/<prefix>-000000.tar`, `-000001.tar`, ... of about `max_bytes` each.
+
+    Not thread safe, call `write` from one thread.
+    """
+
+    def __init__(self, dst_dir: str, prefix: str, max_bytes: int):
+        if not os.path.exists(dst_dir):
+            os.makedirs(dst_dir, exist_ok=True)
+        self.dst_dir = dst_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.shard_index = 0
+        self.shard_list: List[str] = list()
+        self.tar: Optional[tarfile.TarFile] = None
+        self.shard_path: Optional[str] = None
+
+    def _open(self):
+        self.shard_path = os.path.join(self.dst_dir, SHARD_PATTERN.format(prefix=self.prefix, index=self.shard_index))
+        self.tar = tarfile.open(self.shard_path, 'w', format=tarfile.USTAR_FORMAT)
+        self.shard_index += 1
+
+    def _close(self):
+        if self.tar is None:
+            return
+        self.tar.close()
+        with open(index_path_of(self.shard_path), 'w') as f:
+            json.dump(build_index(self.shard_path), f)
+        self.shard_list.append(self.shard_path)
+        self.tar = None
+
+    def write(self, key: str, members: Dict[str, bytes]):
+        assert '.' not in key, f"Sample key {key} must not contain '.'"
+        if self.tar is None:
+            self._open()
+        for ext, data in members.items():
+            info = tarfile.TarInfo(f"{key}.{ext}")
+            info.size = len(data)
+            self.tar.addfile(info, io.BytesIO(data))
+        if self.tar.offset >= self.max_bytes:
+            self._close()
+
+    def close(self) -> List[str]:
+        self._close()
+        return self.shard_list
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/22 15:30
+@File    : tile_voclike.py
+@Author  : zj
+@Description:
+
+Cut large VOCLike images into overlapping tiles, so small objects keep their resolution during training.
+
+Tiles of `--tile-size` are placed every `--stride` pixels, the last row/column is aligned to the image border.
+Boxes are clipped to every tile at once with NumPy, a clipped box is kept when at least `--min-visible` of its area
+lies inside the tile. Tiles without boxes are skipped unless `--keep-empty` is given. Each image is decoded once
+and all of its tiles are sliced from it, images are processed in a worker pool.
+
+Usage: Tile VOCLike data into 640x640 tiles with 20% overlap:
+    $ python3 py/tile_voclike.py assets/voclike assets/voclike ./voc.names ./output/tiles/ --tile-size 640 --stride 512
+    $ python3 py/tile_voclike.py assets/voclike assets/voclike ./voc.names ./output/tiles/ --format yolo
+
+For `--format voclike` tiles and XMLs are saved side by side as `aaaa_<x>_<y>.jpg/xml`, for `--format yolo` they
+are saved under `images/` and `labels/`.
+
+"""
+from typing import Dict, Optional, Tuple
+
+import os
+import shutil
+import argparse
+import functools
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+import xmltodict
+from numpy import ndarray
+from tqdm import tqdm
+
+from annotations import ImageRecord, iter_voclike, record_to_yolov5
+from yolo2voclike import load_xml_sample, record_to_voc
+from vocabulary import Relabel, add_vocabulary_args, build_vocabulary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tile VOCLike")
+    parser.add_argument('image', metavar='IMAGE', type=str,
+                        help='Image root.')
+    parser.add_argument('label', metavar='LABEL', type=str,
+                        help='Label path.')
+    parser.add_argument("classes", metavar='CLASSES', type=str,
+                        help="Classes path.")
+    parser.add_argument('dst', metavar='DST', type=str,
+                        help='Save data dir.')
+
+    parser.add_argument('--tile-size', metavar='SIZE', type=int, nargs='+', default=[640],
+                        help='Tile width and height, one value for square tiles.')
+    parser.add_argument('--stride', metavar='STRIDE', type=int, nargs='+', default=None,
+                        help='Horizontal and vertical stride, default is 80%% of the tile size.')
+    parser.add_argument('--min-visible', metavar='RATIO', type=float, default=0.5,
+                        help='Keep a clipped box if at least RATIO of its area is inside the tile.')
+    parser.add_argument('--keep-empty', action='store_true', default=False,
+                        help='Also write tiles without boxes.')
+    parser.add_argument('--format', metavar='FORMAT', type=str, default='voclike', choices=['voclike', 'yolo'],
+                        help='Output format.')
+    parser.add_argument('--workers', metavar='WORKERS', type=int, default=os.cpu_count(),
+                        help='Number of processes.')
+    add_vocabulary_args(parser)
+    args = parser.parse_args()
+    print("args:", args)
+    return args
+
+
+def tile_starts(length: int, tile: int, stride: int) -> ndarray:
+    if length <= tile:
+        return np.array([0])
+    starts = np.arange(0, length - tile + 1, stride)
+    if starts[-1] != length - tile:
+        # Align the last tile to the border instead of leaving a strip uncovered
+        starts = np.append(starts, length - tile)
+    return starts
+
+
+def make_tiles(img_w: int, img_h: int, tile_w: int, tile_h: int, stride_x: int, stride_y: int) -> ndarray:
+    """
+    Return tiles as (T, 4) [xmin, ymin, xmax, ymax].
+    """
+    xs = tile_starts(img_w, tile_w, stride_x)
+    ys = tile_starts(img_h, tile_h, stride_y)
+    x0, y0 = np.meshgrid(xs, ys)
+    x0, y0 = x0.ravel(), y0.ravel()
+    return np.stack([x0, y0, np.minimum(x0 + tile_w, img_w), np.minimum(y0 + tile_h, img_h)], axis=1)
+
+
+def clip_boxes(boxes: ndarray, tiles: ndarray, min_visible: float) -> Tuple[ndarray, ndarray]:
+    """
+    Clip all boxes (N, 4) to all tiles (T, 4) at once.
+
+    Return the clipped boxes (T, N, 4) in tile coordinates and the keep mask (T, N).
+    """
+    clipped = np.empty((len(tiles), len(boxes), 4), dtype=np.float64)
+    clipped[..., :2] = np.maximum(boxes[None, :, :2], tiles[:, None, :2])
+    clipped[..., 2:] = np.minimum(boxes[None, :, 2:], tiles[:, None, 2:])
+
+    inter_w = clipped[..., 2] - clipped[..., 0]
+    inter_h = clipped[..., 3] - clipped[..., 1]
+    box_area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    visible = np.where(box_area[None, :] > 0, inter_w * inter_h / np.maximum(box_area[None, :], 1e-9), 0)
+    keep = (inter_w > 0) & (inter_h > 0) & (visible >= min_visible)
+
+    clipped -= np.tile(tiles[:, None, :2], (1, 1, 2))
+    return clipped, keep
+
+
+def tile_image(record: ImageRecord, relabel: Relabel, save_root: str, out_format: str,
+               tile_size: Tuple[int, int], stride: Tuple[int, int], min_visible: float, keep_empty: bool,
+               xml_sample: Optional[Dict] = None) -> int:
+    record = relabel.apply(record)
+    # Difficult objects are skipped like in the YOLOv5 converters
+    keep = ~record.difficult
+    boxes = record.boxes[keep]
+    class_ids = record.class_ids[keep]
+    names = [n for n, k in zip(record.names, keep) if k]
+
+    image = cv2.imread(record.image_path, cv2.IMREAD_COLOR)
+    assert image is not None, record.image_path
+    img_h, img_w = image.shape[:2]
+    tiles = make_tiles(img_w, img_h, tile_size[0], tile_size[1], stride[0], stride[1])
+    clipped, keep = clip_boxes(boxes, tiles, min_visible)
+
+    if out_format == 'yolo':
+        image_root, label_root = os.path.join(save_root, "images"), os.path.join(save_root, "labels")
+    else:
+        image_root = label_root = save_root
+
+    stem = os.path.splitext(os.path.basename(record.image_path))[0]
+    num = 0
+    for tile, tile_boxes, tile_keep in zip(tiles, clipped, keep):
+        if not keep_empty and not tile_keep.any():
+            continue
+        x0, y0, x1, y1 = [int(x) for x in tile]
+        tile_name = f"{stem}_{x0}_{y0}"
+        tile_path = os.path.join(image_root, tile_name + ".jpg")
+        # A view into the decoded image, no copy
+        assert cv2.imwrite(tile_path, image[y0:y1, x0:x1]), tile_path
+
+        tile_record = ImageRecord(image_path=tile_path, label_path='', width=x1 - x0, height=y1 - y0,
+                                  boxes=tile_boxes[tile_keep], class_ids=class_ids[tile_keep],
+                                  names=tuple(n for n, k in zip(names, tile_keep) if k),
+                                  difficult=np.zeros(int(tile_keep.sum()), dtype=bool))
+        if out_format == 'yolo':
+            np.savetxt(os.path.join(label_root, tile_name + ".txt"), record_to_yolov5(tile_record),
+                       fmt="%f", delimiter=' ')
+        else:
+            xml_string = xmltodict.unparse(record_to_voc(tile_record, relabel.dst, xml_sample), pretty=True)
+            with open(os.path.join(label_root, tile_name + ".xml"), 'w') as f:
+                f.write(xml_string)
+        num += 1
+    return num
+
+
+def main(args):
+    save_root = args.dst
+    if args.format == 'yolo':
+        for dst_dir in [os.path.join(save_root, "images"), os.path.join(save_root, "labels")]:
+            if not os.path.exists(dst_dir):
+                os.makedirs(dst_dir)
+    elif not os.path.exists(save_root):
+        os.makedirs(save_root)
+
+    class_path = args.classes
+    classes, relabel = build_vocabulary(class_path, args)
+    if relabel.identity:
+        shutil.copyfile(class_path, os.path.join(save_root, os.path.basename(class_path)))
+    else:
+        relabel.dst.save(os.path.join(save_root, os.path.basename(class_path)))
+
+    tile_size = tuple(args.tile_size) if len(args.tile_size) == 2 else (args.tile_size[0], args.tile_size[0])
+    if args.stride is None:
+        stride = (int(tile_size[0] * 0.8), int(tile_size[1] * 0.8))
+    else:
+        stride = tuple(args.stride) if len(args.stride) == 2 else (args.stride[0], args.stride[0])
+    assert min(stride) > 0, stride
+
+    worker = functools.partial(tile_image, relabel=relabel, save_root=save_root, out_format=args.format,
+                               tile_size=tile_size, stride=stride, min_visible=args.min_visible,
+                               keep_empty=args.keep_empty,
+                               xml_sample=load_xml_sample() if args.format == 'voclike' else None)
+    num_images = num_tiles = 0
+    print(f"Retrieval {args.label}")
+    with Pool(args.workers) as pool:
+        for num in tqdm(pool.imap(worker, iter_voclike(args.image, args.label, classes), chunksize=4)):
+            num_images += 1
+            num_tiles += num
+
+    print(f"Cut {num_images} images into {num_tiles} tiles")
+    print(f"Save to {save_root}")
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -9,22 +9,54 @@
 Usage - Convert VOC to COCO:
     $ python voc2coco.py -v ../datasets/voc -c ../datasets/voc2coco -l train-2007 val-2007 test-2007 train-2012 val-2012
 
+Usage - Convert VOC segmentation set to COCO with instance masks (RLE or polygons):
+    $ python voc2coco.py -v ../datasets/voc -c ../datasets/voc2coco -l train-2012 val-2012 --segmentation rle
+
+Usage - Convert VOC to COCO with 4 shards, then merge them:
+    $ python sharding.py 4 -- python voc2coco.py -v ../datasets/voc -c ../datasets/voc2coco -l val-2007
+    $ python merge_coco.py ../datasets/voc2coco/annotations/instances_val2007.shard-*.json --dst ../datasets/voc2coco/annotations/instances_val2007.json
+
+Usage - Convert VOC to COCO, merge bus into car and drop pottedplant:
+    $ python voc2coco.py -v ../datasets/voc -c ../datasets/voc2coco -l val-2007 --merge bus=car --drop pottedplant
+
+Usage - Convert a huge VOC-style set with at most about 512MB of annotations in memory, the rest is spilled to disk:
+    $ python voc2coco.py -v ../datasets/voc -c ../datasets/voc2coco -l train-2012 --max-memory 512
+
+Usage - Convert VOC to COCO with images packed into 1GB tar shards, each image next to a json of its annotations:
+    $ python voc2coco.py -v ../datasets/voc -c ../datasets/voc2coco -l val-2007 --tar-shards 1024
+
+Usage - Convert VOC on network storage to COCO with 32 file operations in flight:
+    $ python voc2coco.py -v /mnt/nfs/voc -c /mnt/nfs/voc2coco -l val-2007 --io-concurrency 32
+
 """
+import io
 import json
 import os
 
 import argparse
-from typing import List
+import itertools
+from typing import List, Optional, Set
+from concurrent.futures import ProcessPoolExecutor
 
 import sys
 import os.path
 
-import numpy as np
 from PIL import Image
 from tqdm import tqdm
 
+import xml.etree.ElementTree as ET
+
 import torchvision.datasets as datasets
 
+from exclude import add_exclude_args, is_excluded, load_exclude
+from sharding import add_shard_args, in_shard, shard_suffix
+from segmentation import encode_mask_file
+from tar_shards import ShardWriter, add_tar_shard_args, read_bytes
+from preprocess import bounded_map
+from spill import SpillList, add_memory_args, dump_json_lists, new_table, report_peak_rss
+from vocabulary import Relabel, Vocabulary, add_vocabulary_args, build_vocabulary
+from async_io import AsyncFileIO, add_io_args, build_io
+
 DELIMITER = '-'
 SUPPORTS = ['train-2007', 'val-2007', 'test-2007', 'trainval-2007',
             'train-2012', 'val-2012', 'trainval-2007']
@@ -39,91 +71,194 @@ def parse_args():
 
     parser.add_argument('--classes', metavar='CLASSES', type=str, default="voc.names",
                         help='Path of VOC classes')
+    parser.add_argument('--segmentation', metavar='SEGMENTATION', type=str, default=None, choices=['rle', 'polygon'],
+                        help='Add instance masks from SegmentationObject, only images with a mask are converted.')
+    parser.add_argument('--workers', metavar='WORKERS', type=int, default=os.cpu_count(),
+                        help='Number of processes used to encode masks.')
+    add_shard_args(parser)
+    add_exclude_args(parser)
+    add_tar_shard_args(parser)
+    add_memory_args(parser)
+    add_vocabulary_args(parser)
+    add_io_args(parser)
 
     args = parser.parse_args()
     print("args:", args)
     return args
 
 
-def process(dataset: datasets.VOCDetection, cls_list: List, dst_root: str):
+def process(dataset: datasets.VOCDetection, cls_list: List, dst_root: str, num_shards: int = 1, shard_index: int = 0,
+            exclude: Optional[Set[str]] = None,
+            segmentation: Optional[str] = None, workers: Optional[int] = None,
+            shard_writer: Optional[ShardWriter] = None, max_memory: Optional[int] = None,
+            relabel: Optional[Relabel] = None, aio: Optional[AsyncFileIO] = None):
     if not os.path.exists(dst_root):
-        os.makedirs(dst_root)
+        os.makedirs(dst_root, exist_ok=True)
     dst_image_root = os.path.join(dst_root, 'images', f"{dataset.image_set}{dataset.year}")
-    if not os.path.exists(dst_image_root):
-        os.makedirs(dst_image_root)
+    if shard_writer is None and not os.path.exists(dst_image_root):
+        os.makedirs(dst_image_root, exist_ok=True)
     dst_annotations_root = os.path.join(dst_root, 'annotations')
     if not os.path.exists(dst_annotations_root):
-        os.makedirs(dst_annotations_root)
+        os.makedirs(dst_annotations_root, exist_ok=True)
+
+    if relabel is None:
+        relabel = Relabel(cls_list if isinstance(cls_list, Vocabulary) else Vocabulary(cls_list))
+    vocab = relabel.src
 
-    coco_anno_list = list()
-    coco_image_list = list()
+    def mask_path_of(idx: int) -> str:
+        return dataset.annotations[idx].replace('Annotations', 'SegmentationObject').replace('.xml', '.png')
 
     bbox_id = 0
-    for idx in tqdm(range(len(dataset.images))):
-        image, target = dataset.__getitem__(idx)
-        img_w = int(target['annotation']['size']['width'])
-        img_h = int(target['annotation']['size']['height'])
-        file_name = os.path.basename(dataset.images[idx])
-        image_name = os.path.splitext(file_name)[0]
-
-        for obj in target['annotation']['object']:
-            difficult = int(obj['difficult'])
-            if difficult != 0:
+    exclude = set() if exclude is None else exclude
+    indices = (idx for idx in range(len(dataset.images))
+               if in_shard(dataset.images[idx], num_shards, shard_index) and not is_excluded(dataset.images[idx], exclude))
+    if segmentation is not None:
+        indices = (idx for idx in indices if os.path.isfile(mask_path_of(idx)))
+    total = None
+    if max_memory is None:
+        indices = list(indices)
+        total = len(indices)
+        if segmentation is not None:
+            print(f"Found {total} SegmentationObject masks")
+
+    # In memory-bounded mode both tables are spilled to disk in chunks and merged into the json at the end
+    max_bytes = None if max_memory is None else max_memory * 1024 * 1024 // 2
+    coco_anno_list = new_table(max_bytes, dst_annotations_root)
+    coco_image_list = new_table(max_bytes, dst_annotations_root)
+    executor = None
+    try:
+        mask_results = itertools.repeat(None)
+        if segmentation is not None:
+            workers = os.cpu_count() if workers is None else workers
+            # Masks are encoded ahead in worker processes while the main process saves images, at most 4 * workers
+            # masks are in flight
+            executor = ProcessPoolExecutor(workers)
+            indices, mask_indices = itertools.tee(indices)
+            mask_results = bounded_map(executor, encode_mask_file,
+                                       ((mask_path_of(idx), segmentation) for idx in mask_indices),
+                                       max_pending=4 * workers)
+
+        if aio is None:
+            items = ((idx, None) for idx in indices)
+        else:
+            # Images and annotations of the next indices are read in the background, masks are still read by the
+            # worker processes
+            items = aio.read_ahead(indices, lambda idx: (dataset.images[idx], dataset.annotations[idx]))
+
+        for (idx, data), instances in zip(tqdm(items, total=total), mask_results):
+            image_data, xml_data = (None, None) if data is None else data
+            if shard_writer is None:
+                if data is None:
+                    image, target = dataset.__getitem__(idx)
+                else:
+                    # Same as VOCDetection.__getitem__ without transforms
+                    image = Image.open(io.BytesIO(image_data)).convert('RGB')
+                    target = dataset.parse_voc_xml(ET.fromstring(xml_data))
+            else:
+                # Packed images are copied as they are, no need to decode them
+                image = None
+                xml_root = ET.parse(dataset.annotations[idx]).getroot() if data is None else ET.fromstring(xml_data)
+                target = dataset.parse_voc_xml(xml_root)
+            img_w = int(target['annotation']['size']['width'])
+            img_h = int(target['annotation']['size']['height'])
+            file_name = os.path.basename(dataset.images[idx])
+            image_name = os.path.splitext(file_name)[0]
+            image_anno_list = list()
+
+            object_list = target['annotation']['object']
+            # Classes of all objects of the image are relabeled at once
+            class_ids, keep = relabel.remap(vocab.ids_of(obj['name'] for obj in object_list))
+            # Instance k of SegmentationObject is the k-th object, difficult ones included
+            for instance_id, (obj, class_id, is_kept) in enumerate(zip(object_list, class_ids, keep), 1):
+                difficult = int(obj['difficult'])
+                if difficult != 0 or not is_kept:
+                    continue
+
+                cls_name = obj['name']
+                assert class_id >= 0, cls_name
+                xmin = float(obj['bndbox']['xmin'])
+                ymin = float(obj['bndbox']['ymin'])
+                xmax = float(obj['bndbox']['xmax'])
+                ymax = float(obj['bndbox']['ymax'])
+
+                box_w = xmax - xmin
+                box_h = ymax - ymin
+
+                anno_dict = dict()
+                if instances is not None and instance_id in instances:
+                    anno_dict['segmentation'] = instances[instance_id]['segmentation']
+                    anno_dict['area'] = instances[instance_id]['area']
+                else:
+                    if instances is not None:
+                        # No pixel left for this object in the mask, fall back to its box
+                        anno_dict['segmentation'] = [[xmin, ymin, xmax, ymin, xmax, ymax, xmin, ymax]]
+                    anno_dict['area'] = float(box_w * box_h)
+                anno_dict['iscrowd'] = int(0)
+                anno_dict['image_id'] = image_name
+                anno_dict['bbox'] = [xmin, ymin, box_w, box_h]
+                # 分类下标，从1开始
+                anno_dict['category_id'] = int(class_id) + 1
+                # 边界框id，每个边界框一个独立id
+                anno_dict['id'] = bbox_id
+                bbox_id += 1
+                image_anno_list.append(anno_dict)
+            for anno_dict in image_anno_list:
+                coco_anno_list.append(anno_dict)
+
+            image_dict = dict()
+            image_dict['file_name'] = file_name
+            image_dict['height'] = img_h
+            image_dict['width'] = img_w
+            # 图片名。在coco数据集中，需要加上前缀`000000`，生成000000{id}.jpg
+            image_dict['id'] = image_name
+            coco_image_list.append(image_dict)
+
+            # Save
+            if shard_writer is not None:
+                image_anno_dict = {'image': image_dict, 'annotations': image_anno_list}
+                if image_data is None:
+                    image_data = read_bytes(dataset.images[idx])
+                shard_writer.write(image_name, {os.path.splitext(file_name)[1][1:]: image_data,
+                                                'json': json.dumps(image_anno_dict).encode()})
                 continue
-
-            cls_name = obj['name']
-            assert cls_name in cls_list, cls_name
-            xmin = float(obj['bndbox']['xmin'])
-            ymin = float(obj['bndbox']['ymin'])
-            xmax = float(obj['bndbox']['xmax'])
-            ymax = float(obj['bndbox']['ymax'])
-
-            box_w = xmax - xmin
-            box_h = ymax - ymin
-
-            anno_dict = dict()
-            anno_dict['area'] = float(img_w * img_h)
-            anno_dict['iscrowd'] = int(0)
-            anno_dict['image_id'] = image_name
-            anno_dict['bbox'] = [xmin, ymin, box_w, box_h]
-            # 分类下标，从1开始
-            anno_dict['category_id'] = cls_list.index(cls_name) + 1
-            # 边界框id，每个边界框一个独立id
-            anno_dict['id'] = bbox_id
-            bbox_id += 1
-            coco_anno_list.append(anno_dict)
-
-        image_dict = dict()
-        image_dict['file_name'] = file_name
-        image_dict['height'] = img_h
-        image_dict['width'] = img_w
-        # 图片名。在coco数据集中，需要加上前缀`000000`，生成000000{id}.jpg
-        image_dict['id'] = image_name
-        coco_image_list.append(image_dict)
-
-        # Save
-        dst_img_path = os.path.join(dst_image_root, file_name)
-        assert not os.path.exists(dst_img_path), dst_img_path
-        assert isinstance(image, Image.Image)
-        image.save(dst_img_path)
-
-    coco_category_list = list()
-    for idx, cls_name in enumerate(cls_list):
-        category_dict = dict()
-        category_dict['supercategory'] = cls_name
-        # 等同于category_id
-        category_dict['id'] = idx + 1
-        category_dict['name'] = cls_name
-        coco_category_list.append(category_dict)
-
-    coco_anno_dict = dict()
-    coco_anno_dict['images'] = coco_image_list
-    coco_anno_dict['annotations'] = coco_anno_list
-    coco_anno_dict['categories'] = coco_category_list
-
-    annotation_path = os.path.join(dst_annotations_root, f'instances_{dataset.image_set}{dataset.year}.json')
-    with open(annotation_path, 'w') as f:
-        json.dump(coco_anno_dict, f)
+            dst_img_path = os.path.join(dst_image_root, file_name)
+            assert not os.path.exists(dst_img_path), dst_img_path
+            assert isinstance(image, Image.Image)
+            if aio is None:
+                image.save(dst_img_path)
+            else:
+                # Encoded in the format PIL picks for the file name
+                buffer = io.BytesIO()
+                image.save(buffer, format=Image.registered_extensions()[os.path.splitext(file_name)[1].lower()])
+                aio.write(dst_img_path, buffer.getvalue())
+
+        if aio is not None:
+            aio.flush()
+
+        coco_category_list = list()
+        for idx, cls_name in enumerate(relabel.dst):
+            category_dict = dict()
+            category_dict['supercategory'] = cls_name
+            # 等同于category_id
+            category_dict['id'] = idx + 1
+            category_dict['name'] = cls_name
+            coco_category_list.append(category_dict)
+
+        coco_anno_dict = dict()
+        coco_anno_dict['images'] = coco_image_list
+        coco_anno_dict['annotations'] = coco_anno_list
+        coco_anno_dict['categories'] = coco_category_list
+
+        annotation_path = os.path.join(dst_annotations_root, f'instances_{dataset.image_set}{dataset.year}{shard_suffix(num_shards, shard_index)}.json')
+        # Written item by item, spilled chunks are read back in order
+        dump_json_lists(annotation_path, coco_anno_dict)
+    finally:
+        # Also on errors, so no worker processes or spill files are left behind
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        for table in (coco_image_list, coco_anno_list):
+            if isinstance(table, SpillList):
+                table.close()
     print(f"Save to {annotation_path}")
 
 
@@ -131,16 +266,39 @@ def main(args):
     data_root = os.path.abspath(args.voc)
     dst_data_root = os.path.abspath(args.coco)
 
-    cls_list = np.loadtxt(args.classes, dtype=str, delimiter=' ')
+    cls_list, relabel = build_vocabulary(args.classes, args)
     print('cls_list:', cls_list)
-
-    for item in args.list:
-        assert item in SUPPORTS, item
-        dataset_type, year = item.split(DELIMITER)
-        print(f"Process Pascal VOC {dataset_type} {year}")
-
-        dataset = datasets.VOCDetection(data_root, year=year, image_set=dataset_type, download=True)
-        process(dataset, list(cls_list), dst_data_root)
+    if not relabel.identity:
+        print('dst cls_list:', relabel.dst)
+    exclude = load_exclude(args.exclude)
+
+    aio = build_io(args)
+    shard_suffix_str = shard_suffix(args.num_shards, args.shard_index)
+    try:
+        for item in args.list:
+            assert item in SUPPORTS, item
+            dataset_type, year = item.split(DELIMITER)
+            print(f"Process Pascal VOC {dataset_type} {year}")
+
+            shard_writer = None
+            if args.tar_shards is not None:
+                # One set of shards per split, like images/<split>
+                shard_writer = ShardWriter(os.path.join(dst_data_root, 'shards'),
+                                           f"{dataset_type}{year}{shard_suffix_str}", args.tar_shards * 1024 * 1024)
+
+            dataset = datasets.VOCDetection(data_root, year=year, image_set=dataset_type, download=True)
+            process(dataset, cls_list, dst_data_root, num_shards=args.num_shards, shard_index=args.shard_index,
+                    exclude=exclude,
+                    segmentation=args.segmentation, workers=args.workers, shard_writer=shard_writer,
+                    max_memory=args.max_memory, relabel=relabel, aio=aio)
+            if shard_writer is not None:
+                shard_list = shard_writer.close()
+                print(f"Save {len(shard_list)} tar shards to {os.path.join(dst_data_root, 'shards')}")
+    finally:
+        if aio is not None:
+            aio.close()
+    if args.max_memory is not None:
+        report_peak_rss(args.max_memory)
 
 
 if __name__ == '__main__':
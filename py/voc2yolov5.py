@@ -10,18 +10,41 @@ Usage - Convert VOC dataset to YOLOv5:
     $ python py/voc2yolov5.py -s ../datasets/voc -d ../datasets/voc2yolov5-train -l trainval-2007 trainval-2012
     $ python py/voc2yolov5.py -s ../datasets/voc -d ../datasets/voc2yolov5-val -l test-2007
 
+Usage - Convert VOC dataset to YOLOv5 and letterbox images to 640x640:
+    $ python py/voc2yolov5.py -s ../datasets/voc -d ../datasets/voc2yolov5-train -l trainval-2007 --letterbox 640 --quality 90
+
+Usage - Convert VOC dataset to YOLOv5, merge bus into car and drop pottedplant, the new class list is written to DST:
+    $ python py/voc2yolov5.py -s ../datasets/voc -d ../datasets/voc2yolov5-train -l trainval-2007 --merge bus=car --drop pottedplant
+
+Usage - Convert VOC dataset to YOLOv5 samples packed into 1GB tar shards under shards/:
+    $ python py/voc2yolov5.py -s ../datasets/voc -d ../datasets/voc2yolov5-train -l trainval-2007 --tar-shards 1024
+
+Usage - Convert VOC dataset on network storage to YOLOv5 with 32 file operations in flight:
+    $ python py/voc2yolov5.py -s /mnt/nfs/voc -d /mnt/nfs/voc2yolov5-train -l trainval-2007 --io-concurrency 32
+
 """
 import argparse
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
 
+import io
 import os.path
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from PIL import Image
 from tqdm import tqdm
+import xml.etree.ElementTree as ET
 
 import torchvision.datasets as datasets
 
+from exclude import add_exclude_args, is_excluded, load_exclude
+from sharding import add_shard_args, in_shard, shard_suffix
+from preprocess import Preprocessor, add_preprocess_args, bounded_map, build_preprocessor
+from label_cache import as_written, write_cache
+from tar_shards import ShardWriter, add_tar_shard_args, labels_to_bytes, read_bytes
+from vocabulary import Relabel, add_vocabulary_args, build_vocabulary
+from async_io import AsyncFileIO, add_io_args, build_io
+
 DELIMITER = '-'
 SUPPORTS = ['train-2007', 'val-2007', 'test-2007', 'trainval-2007',
             'train-2012', 'val-2012', 'trainval-2012']
@@ -36,24 +59,59 @@ def parse_args():
 
     parser.add_argument('--classes', metavar='CLASSES', type=str, default="voc.names",
                         help='Path of VOC classes')
+    add_shard_args(parser)
+    add_exclude_args(parser)
+    add_preprocess_args(parser)
+    add_tar_shard_args(parser)
+    add_vocabulary_args(parser)
+    add_io_args(parser)
+    parser.add_argument('--no-label-cache', action='store_true', default=False,
+                        help='Do not write the YOLOv5 labels.cache.')
 
     args = parser.parse_args()
     print("args:", args)
     return args
 
 
-def process(dataset: datasets.VOCDetection, cls_list: List, dst_root: str):
+def process(dataset: datasets.VOCDetection, cls_list: List, dst_root: str, num_shards: int = 1, shard_index: int = 0,
+            exclude: Optional[Set[str]] = None,
+            preprocessor: Optional[Preprocessor] = None, workers: int = 1,
+            shard_writer: Optional[ShardWriter] = None, relabel: Optional[Relabel] = None,
+            aio: Optional[AsyncFileIO] = None) -> Dict:
+    """
+    Return {dst_image_path: (labels, (width, height))} of the converted images for the YOLOv5 label cache.
+
+    With `shard_writer` the images and labels are packed into tar shards instead, and nothing is returned.
+    With `relabel` the class ids of `cls_list` are renamed, merged or dropped, see `vocabulary.py`.
+    With `aio` images and annotations are read ahead and written asynchronously, see `async_io.py`.
+    """
     if not os.path.exists(dst_root):
-        os.makedirs(dst_root)
+        os.makedirs(dst_root, exist_ok=True)
     dst_image_root = os.path.join(dst_root, 'images')
-    if not os.path.exists(dst_image_root):
-        os.makedirs(dst_image_root)
     dst_label_root = os.path.join(dst_root, 'labels')
-    if not os.path.exists(dst_label_root):
-        os.makedirs(dst_label_root)
-
-    for idx in tqdm(range(len(dataset.images))):
-        image, target = dataset.__getitem__(idx)
+    if shard_writer is None:
+        if not os.path.exists(dst_image_root):
+            os.makedirs(dst_image_root, exist_ok=True)
+        if not os.path.exists(dst_label_root):
+            os.makedirs(dst_label_root, exist_ok=True)
+
+    def save(item: Tuple[int, Optional[List[bytes]]]):
+        # The image and annotation bytes are given when they were read ahead by `aio`
+        idx, data = item
+        image_data, xml_data = (None, None) if data is None else data
+        if preprocessor is None and shard_writer is None:
+            if data is None:
+                image, target = dataset.__getitem__(idx)
+            else:
+                # Same as VOCDetection.__getitem__ without transforms
+                image = Image.open(io.BytesIO(image_data)).convert('RGB')
+                target = dataset.parse_voc_xml(ET.fromstring(xml_data))
+        else:
+            # The preprocessor decodes the image itself, at reduced size if possible, and packed images are
+            # copied as they are
+            image = None
+            xml_root = ET.parse(dataset.annotations[idx]).getroot() if data is None else ET.fromstring(xml_data)
+            target = dataset.parse_voc_xml(xml_root)
         img_w = int(target['annotation']['size']['width'])
         img_h = int(target['annotation']['size']['height'])
 
@@ -76,34 +134,115 @@ def process(dataset: datasets.VOCDetection, cls_list: List, dst_root: str):
             # [x1, y1, x2, y2] -> [cls_id, x_center/img_w, y_center/img_h, box_w/img_w, box_h/img_h]
             label_list.append(
                 [cls_list.index(cls_name), x_center / img_w, y_center / img_h, box_w / img_w, box_h / img_h])
+        if relabel is not None:
+            label_list = relabel.remap_labels(label_list)
 
-        # Save
         image_name = os.path.basename(dataset.images[idx])
-        dst_img_path = os.path.join(dst_image_root, image_name)
-        assert not os.path.exists(dst_img_path), dst_img_path
-        assert isinstance(image, Image.Image)
-        image.save(dst_img_path)
+        if shard_writer is not None:
+            # Encoded here in the worker thread, written to the shard in order by the caller
+            if preprocessor is None:
+                members = {os.path.splitext(image_name)[1][1:]:
+                               read_bytes(dataset.images[idx]) if image_data is None else image_data}
+            else:
+                encoded, _, label_list = preprocessor.to_bytes(dataset.images[idx], label_list, image_data)
+                members = {preprocessor.image_format: encoded}
+            members['txt'] = labels_to_bytes(label_list)
+            return os.path.splitext(image_name)[0], members
+
+        # Save
+        if preprocessor is None:
+            dst_img_path = os.path.join(dst_image_root, image_name)
+            assert not os.path.exists(dst_img_path), dst_img_path
+            assert isinstance(image, Image.Image)
+            if aio is None:
+                image.save(dst_img_path)
+            else:
+                # Encoded in the format PIL picks for the file name
+                buffer = io.BytesIO()
+                image.save(buffer, format=Image.registered_extensions()[os.path.splitext(image_name)[1].lower()])
+                aio.write(dst_img_path, buffer.getvalue())
+            # The saved image carries no EXIF orientation
+            shape = image.size
+        else:
+            dst_img_path = os.path.join(dst_image_root, preprocessor.dst_name(image_name))
+            assert not os.path.exists(dst_img_path), dst_img_path
+            if aio is None:
+                _, shape, label_list = preprocessor(dataset.images[idx], dst_image_root, label_list)
+            else:
+                encoded, shape, label_list = preprocessor.to_bytes(dataset.images[idx], label_list, image_data)
+                aio.write(dst_img_path, encoded)
 
         label_name = os.path.splitext(image_name)[0] + '.txt'
         dst_label_path = os.path.join(dst_label_root, label_name)
         assert not os.path.exists(dst_label_path), dst_label_path
-        np.savetxt(dst_label_path, label_list, fmt='%f', delimiter=' ')
+        if aio is None:
+            np.savetxt(dst_label_path, label_list, fmt='%f', delimiter=' ')
+        else:
+            aio.write(dst_label_path, labels_to_bytes(label_list))
+        return dst_img_path, as_written(label_list), shape
+
+    exclude = set() if exclude is None else exclude
+    indices = [idx for idx in range(len(dataset.images))
+               if in_shard(dataset.images[idx], num_shards, shard_index) and not is_excluded(dataset.images[idx], exclude)]
+    if aio is None:
+        items = ((idx, None) for idx in indices)
+    else:
+        items = aio.read_ahead(indices, lambda idx: (dataset.images[idx], dataset.annotations[idx]))
+    cache_entries = dict()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for result in tqdm(bounded_map(executor, save, items, max_pending=4 * workers), total=len(indices)):
+            if shard_writer is not None:
+                shard_writer.write(*result)
+            else:
+                dst_img_path, label_list, shape = result
+                cache_entries[dst_img_path] = (label_list, shape)
+    if aio is not None:
+        aio.flush()
+    return cache_entries
 
 
 def main(args):
     data_root = os.path.abspath(args.src)
     dst_data_root = os.path.abspath(args.dst)
 
-    cls_list = np.loadtxt(args.classes, dtype=str, delimiter=' ')
+    # O(1) lookups of names and aliases
+    cls_list, relabel = build_vocabulary(args.classes, args)
     print('cls_list:', cls_list)
-
-    for item in args.list:
-        assert item in SUPPORTS, item
-        dataset_type, year = item.split(DELIMITER)
-        print(f"Process Pascal VOC{year} {dataset_type}")
-
-        dataset = datasets.VOCDetection(data_root, year=year, image_set=dataset_type, download=True)
-        process(dataset, list(cls_list), dst_data_root)
+    if not relabel.identity:
+        print('dst cls_list:', relabel.dst)
+        if not os.path.exists(dst_data_root):
+            os.makedirs(dst_data_root, exist_ok=True)
+        relabel.dst.save(os.path.join(dst_data_root, os.path.basename(args.classes)))
+    exclude = load_exclude(args.exclude)
+
+    shard_writer = None
+    if args.tar_shards is not None:
+        shard_writer = ShardWriter(os.path.join(dst_data_root, 'shards'),
+                                   '-'.join(args.list) + shard_suffix(args.num_shards, args.shard_index),
+                                   args.tar_shards * 1024 * 1024)
+
+    aio = build_io(args)
+    cache_entries = dict()
+    try:
+        for item in args.list:
+            assert item in SUPPORTS, item
+            dataset_type, year = item.split(DELIMITER)
+            print(f"Process Pascal VOC{year} {dataset_type}")
+
+            dataset = datasets.VOCDetection(data_root, year=year, image_set=dataset_type, download=True)
+            cache_entries.update(process(dataset, cls_list, dst_data_root,
+                                         num_shards=args.num_shards, shard_index=args.shard_index, exclude=exclude,
+                                         preprocessor=build_preprocessor(args), workers=args.workers,
+                                         shard_writer=shard_writer, relabel=relabel, aio=aio))
+    finally:
+        if aio is not None:
+            aio.close()
+
+    if shard_writer is not None:
+        shard_list = shard_writer.close()
+        print(f"Save {len(shard_list)} tar shards to {os.path.join(dst_data_root, 'shards')}")
+    elif not args.no_label_cache and args.num_shards == 1:
+        write_cache(os.path.join(dst_data_root, 'images'), cache_entries)
 
 
 if __name__ == '__main__':
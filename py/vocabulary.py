@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/24 9:40
+@File    : vocabulary.py
+@Author  : zj
+@Description:
+
+Ordered class vocabulary and relabeling rules shared by all converters.
+
+`Vocabulary` keeps the class names in file order with an O(1) name -> id dict, aliases are extra names resolved to
+an existing class (e.g. `people` -> `person`). It can stand in for the old `cls_list`: `name in vocab`,
+`vocab.index(name)` and `vocab[i]` behave like on a list.
+
+`Relabel` maps the ids of a source vocabulary to a destination vocabulary with a lookup table, so a whole image,
+or a whole batch, is relabeled with one NumPy indexing operation:
+
+    --alias OLD=NAME   read the name OLD in the labels as the class NAME of the classes file
+    --merge OLD=NEW    write class OLD as NEW, a rename if NEW is new, a merge if NEW is another class
+    --drop NAME        remove all objects of class NAME
+
+The destination classes keep the source order, merged classes take the place of the first one and dropped
+classes are removed. Unknown names keep id -1, converters still reject them.
+
+Usage: Merge `bus` into `car`, drop `pottedplant` and accept `people` for `person` while converting:
+    $ python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --merge bus=car --drop pottedplant --alias people=person
+    $ python3 py/voc2coco.py -v ../datasets/voc -c ../datasets/voc2coco -l val-2007 --merge bus=car --drop pottedplant
+
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import argparse
+
+import numpy as np
+from numpy import ndarray
+
+
+def add_vocabulary_args(parser: argparse.ArgumentParser):
+    parser.add_argument('--alias', metavar='OLD=NAME', type=str, nargs='+', default=[],
+                        help='Read the label name OLD as class NAME.')
+    parser.add_argument('--merge', metavar='OLD=NEW', type=str, nargs='+', default=[],
+                        help='Write class OLD as NEW, renames or merges classes.')
+    parser.add_argument('--drop', metavar='NAME', type=str, nargs='+', default=[],
+                        help='Remove all objects of class NAME.')
+
+
+def parse_rules(rule_list: Iterable[str]) -> Dict[str, str]:
+    rule_dict = dict()
+    for rule in rule_list:
+        assert rule.count('=') == 1, f"Rule {rule} must look like OLD=NEW"
+        old, new = [x.strip() for x in rule.split('=')]
+        assert old and new, f"Rule {rule} must look like OLD=NEW"
+        rule_dict[old] = new
+    return rule_dict
+
+
+class Vocabulary:
+
+    def __init__(self, names: Sequence[str], aliases: Optional[Dict[str, str]] = None):
+        self.names: List[str] = list()
+        self.id_dict: Dict[str, int] = dict()
+        for name in names:
+            # A repeated name would shift the id of every later class
+            assert name not in self.id_dict, f"Class {name} is repeated"
+            self.add(name)
+        for alias, name in (aliases or dict()).items():
+            assert name in self.id_dict, f"Alias {alias} refers to unknown class {name}"
+            assert alias not in self.names, f"Alias {alias} is already a class"
+            self.id_dict[alias] = self.id_dict[name]
+
+    @classmethod
+    def load(cls, class_path: str, aliases: Optional[Dict[str, str]] = None) -> 'Vocabulary':
+        # One name per line, `#` comments and blank lines are skipped like np.loadtxt does, a single class is a list
+        # of one
+        with open(class_path, 'r') as f:
+            names = [line.split('#', 1)[0].strip() for line in f]
+        return cls([name for name in names if name], aliases)
+
+    def save(self, class_path: str):
+        with open(class_path, 'w') as f:
+            f.writelines(name + '\n' for name in self.names)
+
+    def add(self, name: str) -> int:
+        """
+        Return the id of `name`, append it first if it is new.
+        """
+        if name not in self.id_dict:
+            self.id_dict[name] = len(self.names)
+            self.names.append(name)
+        return self.id_dict[name]
+
+    def id_of(self, name: str) -> int:
+        return self.id_dict.get(name, -1)
+
+    def ids_of(self, names: Iterable[str]) -> ndarray:
+        return np.fromiter((self.id_dict.get(name, -1) for name in names), dtype=np.int64)
+
+    def index(self, name: str) -> int:
+        # Same as list.index, but O(1)
+        if name not in self.id_dict:
+            raise ValueError(f"{name} is not in vocabulary")
+        return self.id_dict[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.id_dict
+
+    def __getitem__(self, idx: int) -> str:
+        return self.names[idx]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __repr__(self) -> str:
+        return f"Vocabulary({self.names})"
+
+
+class Relabel:
+
+    def __init__(self, src: Vocabulary, merge: Optional[Dict[str, str]] = None, drop: Iterable[str] = ()):
+        merge = merge or dict()
+        drop = set(drop)
+        for name in list(merge) + list(drop):
+            assert name in src.names, f"Unknown class {name}"
+        self.src = src
+        self.dst = Vocabulary([])
+
+        # One extra slot at the end, so id -1 (unknown) stays -1 and is kept
+        self.table = np.full(len(src) + 1, -1, dtype=np.int64)
+        self.keep = np.ones(len(src) + 1, dtype=bool)
+        for src_id, name in enumerate(src.names):
+            if name in drop:
+                self.keep[src_id] = False
+            else:
+                self.table[src_id] = self.dst.add(merge.get(name, name))
+
+    @property
+    def identity(self) -> bool:
+        return self.dst.names == self.src.names
+
+    def remap(self, class_ids: ndarray) -> Tuple[ndarray, ndarray]:
+        """
+        Return (destination ids, keep mask) of source ids, dropped objects are not kept.
+        """
+        class_ids = np.asarray(class_ids, dtype=np.int64)
+        assert len(class_ids) == 0 or class_ids.max() < len(self.src), f"Class id {class_ids.max()} out of range"
+        return self.table[class_ids], self.keep[class_ids]
+
+    def remap_labels(self, labels: ndarray) -> ndarray:
+        """
+        Relabel YOLOv5 labels (N, 5), rows of dropped classes are removed.
+        """
+        labels = np.asarray(labels, dtype=np.float64).reshape(-1, 5)
+        class_ids, keep = self.remap(labels[:, 0].astype(np.int64))
+        labels = labels[keep]
+        labels[:, 0] = class_ids[keep]
+        return labels
+
+    def apply(self, record):
+        """
+        Relabel an `annotations.ImageRecord`, objects of dropped classes are removed.
+        """
+        class_ids, keep = self.remap(record.class_ids)
+        names = tuple(self.dst[i] if i >= 0 else name for i, name, k in zip(class_ids, record.names, keep) if k)
+        return record._replace(boxes=record.boxes[keep], class_ids=class_ids[keep], names=names,
+                               difficult=record.difficult[keep])
+
+
+def build_vocabulary(class_path: str, args) -> Tuple[Vocabulary, Relabel]:
+    vocab = Vocabulary.load(class_path, parse_rules(args.alias))
+    return vocab, Relabel(vocab, parse_rules(args.merge), args.drop)
@@ -9,6 +9,19 @@
 Usage: Convert YOLOv5 labels to Pascal VOC:
     $ python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/
 
+Usage: Convert and resize images to a maximum side of 640 on the fly:
+    $ python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --max-size 640 --quality 90
+
+Usage: Merge classes and drop others while converting, the new class list is written to the YOLOv5 data root:
+    $ python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --merge bus=car --drop pottedplant
+
+Usage: Convert from network storage with 32 file operations in flight:
+    $ python3 py/voclike2yolov5.py /mnt/nfs/voclike /mnt/nfs/voclike ./voc.names ./output/yolo_data/ --io-concurrency 32
+
+Usage: Convert millions of images in constant memory, the label cache is built afterwards:
+    $ python3 py/voclike2yolov5.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --stream
+    $ python3 py/label_cache.py build ./output/yolo_data/
+
 For /path/to/classes, the file content is as follows:
 
     person
@@ -25,17 +38,26 @@ For /path/to/yolov5_data/, the file structure is as follows:
             bbbb.txt
 
 """
-from typing import Dict, List, Any
+from typing import Optional, Set, Tuple
 
+import io
 import os
 import shutil
 import argparse
-import collections
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from tqdm import tqdm
-from pathlib import Path
-import xml.etree.ElementTree as ET
+
+from exclude import add_exclude_args, load_exclude
+from spill import add_stream_args, report_peak_rss
+from vocabulary import Relabel, Vocabulary, add_vocabulary_args, build_vocabulary
+from sharding import add_shard_args
+from annotations import ImageRecord, exif_size, iter_voclike, iter_voclike_paths, read_voc_xml, record_to_yolov5
+from async_io import AsyncFileIO, add_io_args, build_io
+from label_cache import as_written, write_cache
+from preprocess import Preprocessor, add_preprocess_args, bounded_map, build_preprocessor
+from tar_shards import labels_to_bytes
 
 
 def parse_args():
@@ -49,104 +71,123 @@ def parse_args():
 
     parser.add_argument('dst', metavar='DST', type=str,
                         help='YOLOv5 data root path.')
+    add_shard_args(parser)
+    add_exclude_args(parser)
+    add_preprocess_args(parser)
+    parser.add_argument('--no-label-cache', action='store_true', default=False,
+                        help='Do not write the YOLOv5 labels.cache.')
+    add_stream_args(parser)
+    add_vocabulary_args(parser)
+    add_io_args(parser)
     args = parser.parse_args()
     print("args:", args)
     return args
 
 
-def voc2yolov5_label(target: Dict, cls_list: List):
-    img_w = int(target['annotation']['size']['width'])
-    img_h = int(target['annotation']['size']['height'])
-
-    label_list = list()
-    for obj in target['annotation']['object']:
-        difficult = int(obj['difficult'])
-        if difficult != 0:
-            continue
-        cls_name = obj['name']
-        assert cls_name in cls_list, cls_name
-        xmin = float(obj['bndbox']['xmin'])
-        ymin = float(obj['bndbox']['ymin'])
-        xmax = float(obj['bndbox']['xmax'])
-        ymax = float(obj['bndbox']['ymax'])
-
-        x_center = (xmin + xmax) / 2
-        y_center = (ymin + ymax) / 2
-        box_w = xmax - xmin
-        box_h = ymax - ymin
-        # [x1, y1, x2, y2] -> [cls_id, x_center/img_w, y_center/img_h, box_w/img_w, box_h/img_h]
-        label_list.append(
-            [cls_list.index(cls_name), x_center / img_w, y_center / img_h, box_w / img_w, box_h / img_h])
-
-    return label_list
-
-
-def parse_voc_xml(node: ET.Element) -> Dict[str, Any]:
-    voc_dict: Dict[str, Any] = {}
-    children = list(node)
-    if children:
-        def_dic: Dict[str, Any] = collections.defaultdict(list)
-        for dc in map(parse_voc_xml, children):
-            for ind, v in dc.items():
-                def_dic[ind].append(v)
-        if node.tag == "annotation":
-            def_dic["object"] = [def_dic["object"]]
-        voc_dict = {node.tag: {ind: v[0] if len(v) == 1 else v for ind, v in def_dic.items()}}
-    if node.text:
-        text = node.text.strip()
-        if not children:
-            voc_dict[node.tag] = text
-    return voc_dict
-
-
-def load_voc_data(image_dir: str, label_dir: str):
-    assert os.path.isdir(image_dir) and os.path.isdir(label_dir), "Image and label directories must exist"
-
-    image_list = list()
-    xml_list = list()
-    print(f"Retrieval {label_dir}")
-    for xml_path in Path(label_dir).rglob(pattern="*.xml"):
-        image_path = str(xml_path).replace(label_dir, image_dir).replace(".xml", ".jpg")
-        assert os.path.isfile(image_path), image_path
-
-        image_list.append(image_path)
-        xml_list.append(xml_path)
-
-    return image_list, xml_list
+def convert(image_dir: str, label_dir: str, class_path: str, save_root: str,
+            num_shards: int = 1, shard_index: int = 0, exclude: Optional[Set[str]] = None,
+            preprocessor: Optional[Preprocessor] = None, workers: int = 1, label_cache: bool = True,
+            stream: bool = False, relabel: Optional[Relabel] = None,
+            aio: Optional[AsyncFileIO] = None) -> int:
+    """
+    Convert VOCLike data in-process, return the number of converted images.
 
-
-def main(args):
-    save_root = args.dst
+    Unless sharded, a YOLOv5 `labels.cache` is written from the labels and image sizes already in memory.
+    With `stream` files are discovered lazily and nothing is kept per image, so no cache is written.
+    With `relabel` classes are renamed, merged or dropped on the way, see `vocabulary.py`.
+    With `aio` labels and images are read ahead and written asynchronously, see `async_io.py`.
+    """
     dst_image_root = os.path.join(save_root, "images")
     if not os.path.exists(dst_image_root):
-        os.makedirs(dst_image_root)
+        os.makedirs(dst_image_root, exist_ok=True)
     dst_label_root = os.path.join(save_root, "labels")
     if not os.path.exists(dst_label_root):
-        os.makedirs(dst_label_root)
+        os.makedirs(dst_label_root, exist_ok=True)
 
-    class_path = args.classes
+    if relabel is None:
+        relabel = Relabel(Vocabulary.load(class_path))
     dst_class_path = os.path.join(save_root, os.path.basename(class_path))
-    shutil.copyfile(class_path, dst_class_path)
-    classes = np.loadtxt(class_path, dtype=str, delimiter=' ').tolist()
-    if isinstance(classes, str):
-        classes = [classes]
+    if relabel.identity:
+        shutil.copyfile(class_path, dst_class_path)
+    else:
+        relabel.dst.save(dst_class_path)
+    classes = relabel.src
+
+    def save(item: Tuple[ImageRecord, Optional[bytes]]):
+        # The image bytes are given when they were read ahead by `aio`
+        record, image_data = item
+        label_list = record_to_yolov5(relabel.apply(record))
 
-    image_list, xml_list = load_voc_data(args.image, args.label)
-    for image_path, xml_path in tqdm(zip(image_list, xml_list), total=len(image_list)):
         # Image
-        image_name = os.path.basename(image_path)
-        dst_image_path = os.path.join(dst_image_root, image_name)
-        shutil.copyfile(image_path, dst_image_path)
+        image_name = os.path.basename(record.image_path)
+        if preprocessor is None:
+            dst_image_path = os.path.join(dst_image_root, image_name)
+            if aio is None:
+                shutil.copyfile(record.image_path, dst_image_path)
+                shape = exif_size(dst_image_path) if label_cache else None
+            else:
+                aio.write(dst_image_path, image_data)
+                shape = exif_size(io.BytesIO(image_data)) if label_cache else None
+        elif aio is None:
+            dst_image_path, shape, label_list = preprocessor(record.image_path, dst_image_root, label_list)
+        else:
+            data, shape, label_list = preprocessor.to_bytes(record.image_path, label_list, image_data)
+            dst_image_path = os.path.join(dst_image_root, preprocessor.dst_name(image_name))
+            aio.write(dst_image_path, data)
 
         # Label
-        target = parse_voc_xml(ET.parse(xml_path).getroot())
-        label_list = voc2yolov5_label(target, classes)
-
-        label_name = os.path.basename(xml_path).replace(".xml", ".txt")
+        label_name = os.path.basename(record.label_path).replace(".xml", ".txt")
         dst_label_path = os.path.join(dst_label_root, label_name)
-        np.savetxt(dst_label_path, label_list, fmt="%f", delimiter=' ')
+        if aio is None:
+            np.savetxt(dst_label_path, label_list, fmt="%f", delimiter=' ')
+        else:
+            aio.write(dst_label_path, labels_to_bytes(label_list))
+        return dst_image_path, as_written(label_list), shape
+
+    num = 0
+    cache_entries = dict()
+    if label_cache and stream:
+        # labels.cache is a single pickled dict of every image, it cannot be written in constant memory
+        print("Skip labels.cache in streaming mode, build it afterwards with py/label_cache.py")
+    label_cache = label_cache and num_shards == 1 and not stream
+    print(f"Retrieval {label_dir}")
+    if aio is None:
+        items = ((record, None) for record in iter_voclike(image_dir, label_dir, classes, num_shards=num_shards,
+                                                           shard_index=shard_index, exclude=exclude,
+                                                           sort=not stream))
+    else:
+        # No stat per image, XML and image bytes of the next items are read in the background
+        path_pairs = iter_voclike_paths(image_dir, label_dir, num_shards=num_shards, shard_index=shard_index,
+                                        exclude=exclude, sort=not stream, check_image=False)
+        items = ((read_voc_xml(xml_path, image_path, classes.id_dict, xml_data), image_data)
+                 for (image_path, xml_path), (xml_data, image_data)
+                 in aio.read_ahead(path_pairs, lambda pair: (pair[1], pair[0])))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for dst_image_path, label_list, shape in tqdm(bounded_map(executor, save, items, max_pending=4 * workers)):
+            if label_cache:
+                cache_entries[dst_image_path] = (label_list, shape)
+            num += 1
+    if aio is not None:
+        aio.flush()
+    if label_cache:
+        write_cache(dst_image_root, cache_entries)
 
     print(f"Save to {save_root}")
+    return num
+
+
+def main(args):
+    aio = build_io(args)
+    try:
+        convert(args.image, args.label, args.classes, args.dst, num_shards=args.num_shards,
+                shard_index=args.shard_index, exclude=load_exclude(args.exclude),
+                preprocessor=build_preprocessor(args), workers=args.workers, label_cache=not args.no_label_cache,
+                stream=args.stream, relabel=build_vocabulary(args.classes, args)[1], aio=aio)
+    finally:
+        if aio is not None:
+            aio.close()
+    if args.stream:
+        report_peak_rss()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/19 10:12
+@File    : watch_voclike.py
+@Author  : zj
+@Description:
+
+Watch a live VOCLike labeling directory and keep a YOLOv5 copy in sync.
+
+On startup every XML is converted once (files whose YOLOv5 label is already newer than the XML are skipped).
+After that only the XMLs that were created, changed or deleted are re-converted. Bursts of events are debounced
+and handled as one batch. The class list and per-class object counts are kept up to date incrementally and
+written to `DST/<classes>` and `DST/class_counts.txt`, only objects that are written to the labels are counted
+(difficult and dropped ones are not). New class names are appended to the end of the class list, so existing class
+ids never change, also across restarts: the class list saved in DST is loaded again on startup.
+
+XMLs whose image is missing are skipped, and their outputs are removed if the image was deleted. They are
+converted again once the image appears. Classes can be merged, dropped and aliased with `--merge`, `--drop` and
+`--alias` like in the converters, see `vocabulary.py`.
+
+Events come from inotify when `inotify_simple` is installed (`pip install inotify_simple`), otherwise the
+directories are polled.
+
+Usage: Watch VOCLike data and sync to YOLOv5 format:
+    $ python3 py/watch_voclike.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/
+    $ python3 py/watch_voclike.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --polling --interval 2
+    $ python3 py/watch_voclike.py assets/voclike assets/voclike ./voc.names ./output/yolo_data/ --drop pottedplant
+
+"""
+from typing import Dict, Iterable, List, Set, Tuple, Optional
+
+import os
+import time
+import shutil
+import argparse
+import collections
+
+import numpy as np
+import xml.etree.ElementTree as ET
+
+from annotations import ImageRecord, read_voc_xml, record_to_yolov5
+from vocabulary import Relabel, Vocabulary, add_vocabulary_args, parse_rules
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Watch VOCLike")
+    parser.add_argument('image', metavar='IMAGE', type=str,
+                        help='Image root.')
+    parser.add_argument('label', metavar='LABEL', type=str,
+                        help='Label path.')
+    parser.add_argument("classes", metavar='CLASSES', type=str,
+                        help="Classes path.")
+
+    parser.add_argument('dst', metavar='DST', type=str,
+                        help='YOLOv5 data root path.')
+
+    parser.add_argument('--polling', action='store_true', default=False,
+                        help='Poll the directories even if inotify is available.')
+    parser.add_argument('--interval', metavar='INTERVAL', type=float, default=1.0,
+                        help='Polling interval in seconds.')
+    parser.add_argument('--debounce', metavar='DEBOUNCE', type=float, default=0.5,
+                        help='Quiet time in seconds before a batch of changes is processed.')
+    parser.add_argument('--max-delay', metavar='MAX_DELAY', type=float, default=5.0,
+                        help='Maximum time in seconds a change may wait while events keep arriving.')
+    add_vocabulary_args(parser)
+    args = parser.parse_args()
+    print("args:", args)
+    return args
+
+
+def snapshot(root: str, suffix: str) -> Dict[str, Tuple[int, int]]:
+    stats = dict()
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            if not file_name.endswith(suffix):
+                continue
+            file_path = os.path.join(dir_path, file_name)
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            stats[file_path] = (st.st_mtime_ns, st.st_size)
+    return stats
+
+
+class PollingWatcher:
+    """
+    Detect changed files by comparing (mtime, size) snapshots of the watched directories.
+    """
+
+    def __init__(self, roots: List[str], suffixes: Tuple[str, ...], interval: float = 1.0):
+        self.roots = roots
+        self.suffixes = suffixes
+        self.interval = interval
+        self.stats = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        stats = dict()
+        for root in self.roots:
+            for suffix in self.suffixes:
+                stats.update(snapshot(root, suffix))
+        return stats
+
+    def read(self, timeout: float) -> Set[str]:
+        # A snapshot walks the whole tree, so it is taken every `interval` only. `timeout` is not used, the caller
+        # debounces the returned changes
+        time.sleep(self.interval)
+        stats = self._snapshot()
+        changed = {path for path, st in stats.items() if self.stats.get(path) != st}
+        changed |= set(self.stats.keys()) - set(stats.keys())
+        self.stats = stats
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Receive change events from inotify. Sub-directories are watched recursively, including ones created later.
+    """
+
+    def __init__(self, roots: List[str], suffixes: Tuple[str, ...]):
+        assert inotify_simple is not None, "inotify_simple is not installed"
+        self.suffixes = suffixes
+        self.inotify = inotify_simple.INotify()
+        flags = inotify_simple.flags
+        self.mask = flags.CLOSE_WRITE | flags.MODIFY | flags.CREATE | flags.DELETE | \
+                    flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE_SELF
+        self.wd_dict: Dict[int, str] = dict()
+        for root in roots:
+            for dir_path, _, _ in os.walk(root):
+                self._add_watch(dir_path)
+
+    def _add_watch(self, dir_path: str):
+        if dir_path in self.wd_dict.values():
+            return
+        wd = self.inotify.add_watch(dir_path, self.mask)
+        self.wd_dict[wd] = dir_path
+
+    def read(self, timeout: float) -> Set[str]:
+        flags = inotify_simple.flags
+        changed = set()
+        for event in self.inotify.read(timeout=int(timeout * 1000)):
+            dir_path = self.wd_dict.get(event.wd)
+            if dir_path is None:
+                continue
+            if event.mask & flags.IGNORED:
+                self.wd_dict.pop(event.wd)
+                continue
+            path = os.path.join(dir_path, event.name)
+            if event.mask & flags.ISDIR:
+                if event.mask & (flags.CREATE | flags.MOVED_TO):
+                    # Files written before the watch was added are picked up from a snapshot
+                    for root, _, _ in os.walk(path):
+                        self._add_watch(root)
+                    for suffix in self.suffixes:
+                        changed |= set(snapshot(path, suffix).keys())
+                continue
+            if path.endswith(self.suffixes):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        self.inotify.close()
+
+
+class VOCLikeSyncer:
+    """
+    Keep YOLOv5 labels/images and the class statistics in sync with a VOCLike label tree.
+    """
+
+    def __init__(self, image_dir: str, label_dir: str, class_path: str, dst_root: str,
+                 aliases: Optional[Dict[str, str]] = None, merge: Optional[Dict[str, str]] = None,
+                 drop: Iterable[str] = ()):
+        self.image_dir = image_dir
+        self.label_dir = label_dir
+
+        self.dst_image_root = os.path.join(dst_root, "images")
+        if not os.path.exists(self.dst_image_root):
+            os.makedirs(self.dst_image_root)
+        self.dst_label_root = os.path.join(dst_root, "labels")
+        if not os.path.exists(self.dst_label_root):
+            os.makedirs(self.dst_label_root)
+        self.dst_class_path = os.path.join(dst_root, os.path.basename(class_path))
+        self.dst_count_path = os.path.join(dst_root, "class_counts.txt")
+
+        # O(1) lookups, new classes are appended to the source classes and the relabel table is rebuilt
+        self.classes = Vocabulary.load(class_path, aliases)
+        self.merge = merge or dict()
+        self.drop = list(drop)
+        self.relabel = Relabel(self.classes, self.merge, self.drop)
+        if os.path.isfile(self.dst_class_path):
+            # Classes found by an earlier run keep their ids
+            saved_names = Vocabulary.load(self.dst_class_path).names
+            for name in saved_names:
+                if name not in self.relabel.dst:
+                    self.classes.add(name)
+            self.relabel = Relabel(self.classes, self.merge, self.drop)
+            assert self.relabel.dst.names[:len(saved_names)] == saved_names, \
+                f"{self.dst_class_path} does not match {class_path} and the relabel rules, use another DST"
+
+        # Objects per class contributed by each XML, so a changed or deleted file can be subtracted again
+        self.xml_counts: Dict[str, collections.Counter] = dict()
+        self.class_counts = collections.Counter()
+        # XMLs that could not be converted yet (XML half written)
+        self.pending: Set[str] = set()
+
+    def image_path(self, xml_path: str) -> str:
+        return xml_path.replace(self.label_dir, self.image_dir).replace(".xml", ".jpg")
+
+    def xml_path(self, image_path: str) -> str:
+        return image_path.replace(self.image_dir, self.label_dir).replace(".jpg", ".xml")
+
+    def dst_paths(self, xml_path: str) -> Tuple[str, str]:
+        name = os.path.splitext(os.path.basename(xml_path))[0]
+        return os.path.join(self.dst_image_root, name + ".jpg"), os.path.join(self.dst_label_root, name + ".txt")
+
+    def _remove(self, xml_path: str) -> bool:
+        counter = self.xml_counts.pop(xml_path, None)
+        if counter is not None:
+            self.class_counts.subtract(counter)
+        removed = counter is not None
+        for dst_path in self.dst_paths(xml_path):
+            if os.path.isfile(dst_path):
+                os.remove(dst_path)
+                removed = True
+        return removed
+
+    def _read(self, xml_path: str) -> Optional[ImageRecord]:
+        """
+        Read and relabel an XML, new class names are added. None if the XML is incomplete.
+        """
+        try:
+            record = read_voc_xml(xml_path, self.image_path(xml_path), self.classes.id_dict)
+        except (ET.ParseError, KeyError, ValueError):
+            # The annotator is still writing the file, try again with the next batch
+            return None
+        if np.any(record.class_ids < 0):
+            for cls_name, cls_id in zip(record.names, record.class_ids):
+                if cls_id < 0 and cls_name not in self.classes:
+                    print(f"New class {cls_name} in {xml_path}")
+                    self.classes.add(cls_name)
+            self.relabel = Relabel(self.classes, self.merge, self.drop)
+            record = record._replace(class_ids=self.classes.ids_of(record.names))
+        return self.relabel.apply(record)
+
+    def _update_counts(self, xml_path: str, record: ImageRecord):
+        # Only objects that are written, difficult and dropped ones are not in the labels
+        counter = collections.Counter(name for name, difficult in zip(record.names, record.difficult)
+                                      if not difficult)
+        old_counter = self.xml_counts.get(xml_path)
+        if old_counter is not None:
+            self.class_counts.subtract(old_counter)
+        self.class_counts.update(counter)
+        self.xml_counts[xml_path] = counter
+
+    def _convert(self, xml_path: str) -> bool:
+        record = self._read(xml_path)
+        if record is None:
+            return False
+        label_list = record_to_yolov5(record)
+
+        dst_image_path, dst_label_path = self.dst_paths(xml_path)
+        try:
+            shutil.copyfile(record.image_path, dst_image_path)
+        except FileNotFoundError:
+            # The image was deleted meanwhile, its outputs are removed with the next batch
+            return False
+        np.savetxt(dst_label_path, label_list, fmt="%f", delimiter=' ')
+        self._update_counts(xml_path, record)
+        return True
+
+    def is_synced(self, xml_path: str) -> bool:
+        _, dst_label_path = self.dst_paths(xml_path)
+        return os.path.isfile(self.image_path(xml_path)) and os.path.isfile(dst_label_path) and \
+            os.path.getmtime(dst_label_path) >= os.path.getmtime(xml_path)
+
+    def count(self, xml_path: str):
+        record = self._read(xml_path)
+        if record is None:
+            self.pending.add(xml_path)
+            return
+        self._update_counts(xml_path, record)
+
+    def sync(self, paths: Set[str]) -> int:
+        xml_set = set(self.pending)
+        for path in paths:
+            xml_set.add(self.xml_path(path) if path.endswith(".jpg") else path)
+
+        self.pending = set()
+        num_changed = 0
+        for xml_path in sorted(xml_set):
+            if not os.path.isfile(xml_path) or not os.path.isfile(self.image_path(xml_path)):
+                # Deleted XML or image. An XML without image is converted again by the event of its image
+                if self._remove(xml_path):
+                    num_changed += 1
+                continue
+            if self._convert(xml_path):
+                num_changed += 1
+            else:
+                self.pending.add(xml_path)
+
+        if num_changed > 0:
+            self.save_classes()
+        return num_changed
+
+    def save_classes(self):
+        self.relabel.dst.save(self.dst_class_path)
+        with open(self.dst_count_path, 'w') as f:
+            for cls_name in self.relabel.dst:
+                f.write(f"{cls_name} {self.class_counts[cls_name]}\n")
+
+
+def main(args):
+    image_dir = args.image
+    label_dir = args.label
+    assert os.path.isdir(image_dir) and os.path.isdir(label_dir), "Image and label directories must exist"
+    syncer = VOCLikeSyncer(image_dir, label_dir, args.classes, args.dst, aliases=parse_rules(args.alias),
+                           merge=parse_rules(args.merge), drop=args.drop)
+
+    roots = [label_dir] if os.path.samefile(image_dir, label_dir) else [label_dir, image_dir]
+    suffixes = (".xml", ".jpg")
+    if inotify_simple is not None and not args.polling:
+        print("Watch with inotify")
+        watcher = InotifyWatcher(roots, suffixes)
+    else:
+        print(f"Watch with polling every {args.interval}s")
+        watcher = PollingWatcher(roots, suffixes, interval=args.interval)
+
+    # Initial sync. The watcher is created first so that nothing written in between is lost
+    print(f"Retrieval {label_dir}")
+    dirty = set()
+    for xml_path in snapshot(label_dir, ".xml").keys():
+        if syncer.is_synced(xml_path):
+            syncer.count(xml_path)
+        else:
+            dirty.add(xml_path)
+    num_changed = syncer.sync(dirty)
+    syncer.save_classes()
+    print(f"Synced {num_changed} files, {len(syncer.xml_counts)} in total. Save to {args.dst}")
+
+    changed = set()
+    first_time: Optional[float] = None
+    last_time: Optional[float] = None
+    try:
+        while True:
+            paths = watcher.read(timeout=args.debounce)
+            now = time.time()
+            if paths:
+                changed |= paths
+                last_time = now
+                if first_time is None:
+                    first_time = now
+            elif not changed and syncer.pending:
+                # Retry files that were incomplete in the previous batch
+                changed = set(syncer.pending)
+                first_time = last_time = now - args.debounce
+
+            if first_time is None:
+                continue
+            if now - last_time >= args.debounce or now - first_time >= args.max_delay:
+                num_changed = syncer.sync(changed)
+                if num_changed > 0:
+                    print(f"Synced {num_changed} files, {len(syncer.xml_counts)} in total")
+                changed = set()
+                first_time = last_time = None
+    except KeyboardInterrupt:
+        print("Stop watching")
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -9,6 +9,9 @@
 Usage: Convert YOLOv5 labels to Pascal VOC:
     $ python3 py/yolo2voclike.py /path/to/yolov5_data/ /path/to/classes /path/to/voc_data/
 
+Usage: Convert on network storage with 32 file operations in flight:
+    $ python3 py/yolo2voclike.py /mnt/nfs/yolov5_data/ /path/to/classes /mnt/nfs/voc_data/ --io-concurrency 32
+
 For /path/to/yolov5_data/, the file structure is as follows:
 
     yolov5_data/
@@ -35,15 +38,22 @@ For /path/to/voc_data/, the save structure is as follows:
 
 """
 
+from typing import Dict, List, Optional, Set
+
 import os
-import glob
+import copy
 import argparse
 import shutil
 import xmltodict
-import cv2
 
-from tqdm import tqdm
 import numpy as np
+from tqdm import tqdm
+
+from exclude import add_exclude_args, load_exclude
+from sharding import add_shard_args
+from annotations import ImageRecord, iter_yolo, iter_yolo_paths, read_yolo_txt
+from async_io import AsyncFileIO, add_io_args, build_io
+from vocabulary import Relabel, Vocabulary, add_vocabulary_args, build_vocabulary
 
 XML_SAMPLE = "assets/voclike/000136.xml"
 
@@ -57,56 +67,38 @@ def parse_args():
 
     parser.add_argument('dst', metavar='DST', type=str,
                         help='VOCLike data root path.')
+    add_shard_args(parser)
+    add_exclude_args(parser)
+    add_vocabulary_args(parser)
+    add_io_args(parser)
 
     args = parser.parse_args()
     print("args:", args)
     return args
 
 
-def load_yolo_data(root):
-    assert os.path.isdir(root), root
-
-    image_root = os.path.join(root, "images")
-    assert os.path.isdir(image_root), image_root
-    label_root = os.path.join(root, "labels")
-    assert os.path.isdir(label_root), label_root
-
-    image_list = list()
-    label_list = list()
-    for label_path in list(glob.glob(os.path.join(label_root, "*.txt"))):
-        image_path = label_path.replace("labels", "images").replace(".txt", ".jpg")
-        if os.path.isfile(image_path):
-            image_list.append(image_path)
-            label_list.append(label_path)
-
-    return image_list, label_list
+def load_xml_sample(xml_path: str = XML_SAMPLE) -> Dict:
+    with open(xml_path, 'rb') as xml_file:
+        return xmltodict.parse(xml_file.read())
 
 
-def parse_yolo_to_voc(image_path, label_path, classes):
-    with open(XML_SAMPLE, 'rb') as xml_file:
-        data_dict = xmltodict.parse(xml_file.read())
+def record_to_voc(record: ImageRecord, classes: List, xml_sample: Optional[Dict] = None) -> Dict:
+    data_dict = copy.deepcopy(load_xml_sample() if xml_sample is None else xml_sample)
 
-    image_name = os.path.basename(image_path)
+    image_name = os.path.basename(record.image_path)
     data_dict['annotation']['filename'] = image_name
-    data_dict['annotation']['path'] = image_path
+    data_dict['annotation']['path'] = record.image_path
 
-    image = cv2.imread(image_path, cv2.IMREAD_COLOR)
-    img_height, img_width = image.shape[:2]
-    data_dict['annotation']['size']['width'] = img_width
-    data_dict['annotation']['size']['height'] = img_height
+    data_dict['annotation']['size']['width'] = record.width
+    data_dict['annotation']['size']['height'] = record.height
+
+    # Unknown names keep id -1, which would index the last class
+    assert np.all(record.class_ids >= 0), [n for n, i in zip(record.names, record.class_ids) if i < 0]
 
     object_list = list()
-    label_list = np.loadtxt(label_path, dtype=float, delimiter=' ')
-    if len(label_list.shape) == 1:
-        label_list = [label_list]
-    for label in label_list:
-        assert len(label) >= 5, label_path
-        cls_id, x_c, y_c, box_w, box_h = label[:5]
+    for cls_id, box in zip(record.class_ids, record.boxes):
         class_name = classes[int(cls_id)]
-        x_min = int((x_c - box_w / 2) * img_width)
-        y_min = int((y_c - box_h / 2) * img_height)
-        x_max = int((x_c + box_w / 2) * img_width)
-        y_max = int((y_c + box_h / 2) * img_height)
+        x_min, y_min, x_max, y_max = [int(x) for x in box]
         object_list.append({
             'name': class_name,
             'pose': 'Unspecified',
@@ -119,35 +111,77 @@ def parse_yolo_to_voc(image_path, label_path, classes):
     return data_dict
 
 
-def main(args):
-    save_root = args.dst
+def convert(src_root: str, class_path: str, save_root: str, num_shards: int = 1, shard_index: int = 0,
+            exclude: Optional[Set[str]] = None, relabel: Optional[Relabel] = None,
+            aio: Optional[AsyncFileIO] = None) -> int:
+    """
+    Convert YOLOv5 data in-process, return the number of converted images.
+
+    With `relabel` classes are renamed, merged or dropped on the way, see `vocabulary.py`.
+    With `aio` labels and images are read ahead and written asynchronously, see `async_io.py`.
+    """
     if not os.path.exists(save_root):
-        os.makedirs(save_root)
+        os.makedirs(save_root, exist_ok=True)
 
-    class_path = args.classes
+    if relabel is None:
+        relabel = Relabel(Vocabulary.load(class_path))
     dst_class_path = os.path.join(save_root, os.path.basename(class_path))
-    shutil.copyfile(class_path, dst_class_path)
-    classes = np.loadtxt(class_path, dtype=str, delimiter=' ').tolist()
-    if isinstance(classes, str):
-        classes = [classes]
-
-    image_list, label_list = load_yolo_data(args.src)
-    for image_path, label_path in tqdm(zip(image_list, label_list), total=len(image_list)):
+    if relabel.identity:
+        shutil.copyfile(class_path, dst_class_path)
+    else:
+        relabel.dst.save(dst_class_path)
+    classes = relabel.src
+    xml_sample = load_xml_sample()
+
+    if aio is None:
+        items = ((record, None) for record in iter_yolo(src_root, classes, num_shards=num_shards,
+                                                        shard_index=shard_index, exclude=exclude))
+    else:
+        # Labels without image are skipped once their image is found missing
+        path_pairs = iter_yolo_paths(src_root, num_shards=num_shards, shard_index=shard_index, exclude=exclude,
+                                     check_image=False)
+        items = ((read_yolo_txt(image_path, label_path, classes, image_data=image_data, label_data=label_data),
+                  image_data)
+                 for (image_path, label_path), (image_data, label_data)
+                 in aio.read_ahead(path_pairs, lambda pair: pair, missing_ok=True) if image_data is not None)
+
+    num = 0
+    for record, image_data in tqdm(items):
         # Image
-        image_name = os.path.basename(image_path)
+        image_name = os.path.basename(record.image_path)
         dst_image_path = os.path.join(save_root, image_name)
-        shutil.copyfile(image_path, dst_image_path)
+        if aio is None:
+            shutil.copyfile(record.image_path, dst_image_path)
+        else:
+            aio.write(dst_image_path, image_data)
 
         # Label
-        data_dict = parse_yolo_to_voc(image_path, label_path, classes)
+        data_dict = record_to_voc(relabel.apply(record), relabel.dst, xml_sample)
         xml_string = xmltodict.unparse(data_dict, pretty=True)
 
-        label_name = os.path.basename(label_path).replace(".txt", ".xml")
+        label_name = os.path.basename(record.label_path).replace(".txt", ".xml")
         dst_label_path = os.path.join(save_root, label_name)
-        with open(dst_label_path, 'w') as f:
-            f.write(xml_string)
+        if aio is None:
+            with open(dst_label_path, 'w') as f:
+                f.write(xml_string)
+        else:
+            aio.write(dst_label_path, xml_string.encode('utf-8'))
+        num += 1
+    if aio is not None:
+        aio.flush()
 
     print(f"Save to {save_root}")
+    return num
+
+
+def main(args):
+    aio = build_io(args)
+    try:
+        convert(args.src, args.classes, args.dst, num_shards=args.num_shards, shard_index=args.shard_index,
+                exclude=load_exclude(args.exclude), relabel=build_vocabulary(args.classes, args)[1], aio=aio)
+    finally:
+        if aio is not None:
+            aio.close()
 
 
 if __name__ == '__main__':
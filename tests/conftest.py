@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/25 14:00
+@File    : conftest.py
+@Author  : zj
+@Description:
+
+The tests import the scripts of py/ as top-level modules, the same way the scripts import each other.
+
+Run them from this directory or with the `pytest` command. `python -m pytest` in the repository root would import
+py/ in place of the `py` package that pytest itself depends on.
+
+Usage:
+    $ cd tests && python -m pytest -q
+
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'py'))
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/26 11:40
+@File    : test_annotations.py
+@Author  : zj
+@Description:
+
+Image sizes under EXIF orientation: `image_size` follows `cv2.imread`, `exif_size` follows YOLOv5.
+
+"""
+import io
+
+import pytest
+from PIL import Image
+
+from annotations import EXIF_ORIENTATION, exif_size, image_size
+
+
+def jpeg_with_orientation(orientation: int) -> bytes:
+    image = Image.new('RGB', (40, 20))
+    exif = image.getexif()
+    exif[EXIF_ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('orientation, cv2_size, yolov5_size', [
+    (1, (40, 20), (40, 20)),
+    (5, (20, 40), (40, 20)),
+    (6, (20, 40), (20, 40)),
+    (7, (20, 40), (40, 20)),
+    (8, (20, 40), (20, 40)),
+])
+def test_exif_orientation(orientation, cv2_size, yolov5_size):
+    data = jpeg_with_orientation(orientation)
+    assert image_size(io.BytesIO(data)) == cv2_size
+    assert exif_size(io.BytesIO(data)) == yolov5_size
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/26 11:05
+@File    : test_find_classes.py
+@Author  : zj
+@Description:
+
+`find_classes` only needs the object names, malformed sizes or boxes must not reject a label.
+
+"""
+from find_classes import find_classes
+
+XML = """<annotation>
+    <size><width>500.0</width><height>375</height><depth>3</depth></size>
+    <object><name>cat</name><difficult/><bndbox><xmin>1.5</xmin><ymin>2</ymin><xmax>30</xmax><ymax>40</ymax></bndbox></object>
+    <object><name>person</name></object>
+</annotation>
+"""
+
+
+def test_find_classes_reads_only_names(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'a.xml').write_text(XML)
+    (tmp_path / 'sub' / 'b.xml').write_text(XML.replace('cat', 'bottle'))
+    assert find_classes(str(tmp_path)) == ['bottle', 'cat', 'person']
+    assert find_classes(str(tmp_path), sort=False) == ['bottle', 'cat', 'person']
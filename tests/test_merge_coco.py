@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/26 14:15
+@File    : test_merge_coco.py
+@Author  : zj
+@Description:
+
+`merge_coco.py` only merges complete shard sets, and gives the same json as a single-node run.
+
+"""
+import pytest
+
+from merge_coco import merge, sort_shards
+from sharding import parse_shard_suffix, shard_suffix
+
+CATEGORIES = [{'supercategory': 'cat', 'id': 1, 'name': 'cat'}]
+
+
+def shard_path(num_shards: int, shard_index: int) -> str:
+    return f"annotations/instances_val2007{shard_suffix(num_shards, shard_index)}.json"
+
+
+def test_parse_shard_suffix():
+    assert parse_shard_suffix(shard_path(4, 3)) == (4, 3)
+    assert parse_shard_suffix('a.shard-0-of-2.shard-10-of-12.json') == (12, 10)
+    with pytest.raises(AssertionError):
+        parse_shard_suffix('instances_val2007.json')
+    with pytest.raises(AssertionError):
+        parse_shard_suffix('instances_val2007.shard-4-of-4.json')
+
+
+def test_sort_shards():
+    path_list = [shard_path(12, i) for i in range(12)]
+    assert sort_shards(sorted(path_list)) == path_list
+
+
+@pytest.mark.parametrize('path_list', [
+    [shard_path(3, 0), shard_path(3, 2)],
+    [shard_path(2, 0), shard_path(2, 1), shard_path(2, 1).replace('annotations/', 'copy/')],
+    [shard_path(2, 0), shard_path(2, 1), shard_path(3, 2)],
+])
+def test_incomplete_shard_set_is_rejected(path_list):
+    with pytest.raises(AssertionError):
+        sort_shards(path_list)
+
+
+def test_merge_matches_single_run():
+    image_list = [{'file_name': f"{i:06d}.jpg", 'height': 10, 'width': 10, 'id': i} for i in range(6)]
+    anno_list = [{'image_id': i, 'category_id': 1, 'bbox': [0, 0, j + 1, 1], 'id': 0}
+                 for i in range(6) for j in range(i % 3)]
+    for bbox_id, anno in enumerate(anno_list):
+        anno['id'] = bbox_id
+    single = {'images': image_list, 'annotations': anno_list, 'categories': CATEGORIES}
+
+    coco_list = list()
+    for shard_index in range(2):
+        images = [image for image in image_list if image['id'] % 2 == shard_index]
+        ids = {image['id'] for image in images}
+        coco_list.append({'images': images, 'annotations': [anno for anno in anno_list if anno['image_id'] in ids],
+                          'categories': CATEGORIES})
+    assert merge(coco_list) == single
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/25 14:05
+@File    : test_segmentation.py
+@Author  : zj
+@Description:
+
+`encode_instances` against the reference encoder of pycocotools.
+
+"""
+import numpy as np
+import pytest
+
+from segmentation import VOID, encode_instances
+
+mask_utils = pytest.importorskip('pycocotools.mask')
+
+
+def random_label_map(seed: int) -> np.ndarray:
+    # Blocks of instances with a void border and some noise, like SegmentationObject
+    rng = np.random.default_rng(seed)
+    label_map = np.zeros((37, 53), dtype=np.uint8)
+    for instance_id in range(1, 5):
+        y0, x0 = rng.integers(0, 30), rng.integers(0, 45)
+        label_map[y0:y0 + rng.integers(3, 20), x0:x0 + rng.integers(3, 25)] = instance_id
+    noise = rng.random(label_map.shape)
+    label_map[noise < 0.05] = VOID
+    label_map[noise > 0.97] = 2
+    return label_map
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_rle_matches_pycocotools(seed):
+    label_map = random_label_map(seed)
+    result = encode_instances(label_map, 'rle')
+    assert set(result.keys()) == set(np.unique(label_map).tolist()) - {0, VOID}
+
+    for instance_id, item in result.items():
+        expected = mask_utils.encode(np.asfortranarray((label_map == instance_id).astype(np.uint8)))
+        assert item['segmentation']['counts'] == expected['counts'].decode()
+        assert item['segmentation']['size'] == list(expected['size'])
+        assert item['area'] == float(mask_utils.area(expected))
+
+
+def test_instance_touching_the_last_pixel():
+    # No trailing background run
+    label_map = np.zeros((4, 4), dtype=np.uint8)
+    label_map[2:, 2:] = 1
+    expected = mask_utils.encode(np.asfortranarray(label_map))
+    assert encode_instances(label_map, 'rle')[1]['segmentation']['counts'] == expected['counts'].decode()
+
+
+def test_polygon_mode():
+    label_map = np.zeros((20, 20), dtype=np.uint8)
+    label_map[5:15, 4:12] = 3
+    result = encode_instances(label_map, 'polygon')
+    assert list(result.keys()) == [3]
+    assert result[3]['area'] == 80.0
+    polygon = np.array(result[3]['segmentation'][0]).reshape(-1, 2)
+    assert polygon[:, 0].min() == 4 and polygon[:, 0].max() == 11
+    assert polygon[:, 1].min() == 5 and polygon[:, 1].max() == 14
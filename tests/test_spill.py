@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/25 15:10
+@File    : test_spill.py
+@Author  : zj
+@Description:
+
+`SpillList` must behave like the plain list it replaces in memory-bounded mode.
+
+"""
+import json
+import os
+
+from spill import SpillList, dump_json_lists, new_table
+
+
+def make_items(num: int):
+    return [{'id': i, 'bbox': [i, i + 0.5, 10, 20], 'name': f"image_{i}.jpg"} for i in range(num)]
+
+
+def test_spill_list_matches_list(tmp_path):
+    items = make_items(100)
+    table = SpillList(256, spill_dir=str(tmp_path))
+    for item in items:
+        table.append(item)
+
+    assert len(table) == len(items)
+    assert len(table.chunk_list) > 1
+    assert all(os.path.isfile(chunk_path) for chunk_path in table.chunk_list)
+    assert list(table) == items
+    # Iteration can be repeated
+    assert list(table) == items
+
+    spill_dir = table.spill_dir
+    table.close()
+    assert not os.path.exists(spill_dir)
+
+
+def test_spill_list_without_spilling(tmp_path):
+    items = make_items(3)
+    table = SpillList(1 << 20, spill_dir=str(tmp_path))
+    for item in items:
+        table.append(item)
+    assert table.chunk_list == []
+    assert list(table) == items
+    table.close()
+
+
+def test_new_table(tmp_path):
+    assert isinstance(new_table(None), list)
+    table = new_table(64, spill_dir=str(tmp_path))
+    assert isinstance(table, SpillList)
+    table.close()
+
+
+def test_dump_json_lists(tmp_path):
+    items = make_items(50)
+    spilled = SpillList(128, spill_dir=str(tmp_path))
+    for item in items:
+        spilled.append(item)
+    empty = SpillList(128, spill_dir=str(tmp_path))
+
+    json_path = str(tmp_path / 'out.json')
+    dump_json_lists(json_path, {'images': items, 'annotations': spilled, 'categories': [], 'empty': empty})
+    with open(json_path, 'r') as f:
+        content = f.read()
+    assert content == json.dumps({'images': items, 'annotations': items, 'categories': [], 'empty': []})
+
+    spilled.close()
+    empty.close()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/26 10:20
+@File    : test_split_dataset.py
+@Author  : zj
+@Description:
+
+Split sizes of `py/split_dataset.py`.
+
+"""
+import numpy as np
+
+from split_dataset import random_split, split_counts, stratified_split
+
+RATIOS = np.array([0.8, 0.2])
+
+
+def long_tailed_classes():
+    # 300 rare classes with 2 images each, 400 images of one common class
+    class_lists = [[f"rare_{i}", 'common'] for i in range(300) for _ in range(2)]
+    class_lists += [['common']] * 400
+    return class_lists
+
+
+def test_split_counts():
+    assert split_counts(1000, RATIOS).tolist() == [800, 200]
+    assert split_counts(3, np.array([0.5, 0.5])).sum() == 3
+    assert split_counts(10, np.array([0.8, 0.1, 0.1])).tolist() == [8, 1, 1]
+
+
+def test_random_split_sizes():
+    split_ids = random_split(1000, RATIOS, np.random.default_rng(0))
+    assert np.bincount(split_ids).tolist() == [800, 200]
+
+
+def test_stratified_split_sizes_on_long_tail():
+    class_lists = long_tailed_classes()
+    for seed in range(5):
+        split_ids = stratified_split(class_lists, RATIOS, np.random.default_rng(seed))
+        assert np.bincount(split_ids, minlength=2).tolist() == [800, 200]
+        # The common bucket still follows the ratios
+        common = np.bincount(split_ids[600:], minlength=2)
+        assert abs(common[1] - 80) <= 8, common
+
+
+def test_stratified_split_sizes_with_distinct_classes():
+    class_lists = [[f"class_{i}"] for i in range(1000)]
+    split_ids = stratified_split(class_lists, RATIOS, np.random.default_rng(0))
+    assert np.bincount(split_ids, minlength=2).tolist() == [800, 200]
+
+    split_ids = stratified_split([['a'], ['b']], np.array([0.5, 0.5]), np.random.default_rng(0))
+    assert sorted(split_ids.tolist()) == [0, 1]
+    split_ids = stratified_split([[], ['a', 'b'], ['b']], np.array([0.8, 0.1, 0.1]), np.random.default_rng(0))
+    assert np.bincount(split_ids, minlength=3).tolist() == split_counts(3, np.array([0.8, 0.1, 0.1])).tolist()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/25 14:35
+@File    : test_tar_shards.py
+@Author  : zj
+@Description:
+
+Round trip of samples through `ShardWriter` and the readers of `py/dataset.py`.
+
+"""
+import os
+
+import numpy as np
+import pytest
+
+from tar_shards import ShardWriter, index_path_of, labels_to_bytes
+
+pytest.importorskip('torch')
+from dataset import TarShardDataset, TarShardIndex, decode_sample, iter_tar_samples  # noqa: E402
+
+
+def make_samples(num: int):
+    rng = np.random.default_rng(0)
+    samples = list()
+    for i in range(num):
+        labels = rng.random((i % 4, 5))
+        samples.append((f"{i:06d}", {'jpg': rng.bytes(int(rng.integers(100, 3000))), 'txt': labels_to_bytes(labels)}))
+    return samples
+
+
+def write_shards(dst_dir: str, samples, max_bytes: int):
+    with ShardWriter(dst_dir, 'test', max_bytes) as writer:
+        for key, members in samples:
+            writer.write(key, members)
+    return writer.shard_list
+
+
+def test_labels_to_bytes_matches_savetxt(tmp_path):
+    labels = np.array([[1, 0.5, 0.25, 0.1, 0.2], [3, 0.125, 0.75, 0.3, 0.4]])
+    label_path = str(tmp_path / 'labels.txt')
+    np.savetxt(label_path, labels, fmt='%f', delimiter=' ')
+    with open(label_path, 'rb') as f:
+        assert labels_to_bytes(labels) == f.read()
+    assert labels_to_bytes([]) == b''
+
+
+def test_round_trip(tmp_path):
+    samples = make_samples(20)
+    shard_list = write_shards(str(tmp_path), samples, max_bytes=8 * 1024)
+    assert len(shard_list) > 1
+    assert all(os.path.isfile(index_path_of(shard_path)) for shard_path in shard_list)
+
+    # Streamed in write order
+    streamed = [sample for shard_path in shard_list for sample in iter_tar_samples(shard_path)]
+    assert [sample['__key__'] for sample in streamed] == [key for key, _ in samples]
+    for sample, (_, members) in zip(streamed, samples):
+        assert sample['jpg'] == members['jpg'] and sample['txt'] == members['txt']
+
+    # Random access through the index sidecars
+    index = TarShardIndex(shard_list, decode=False)
+    assert len(index) == len(samples)
+    for i in [0, 7, len(samples) - 1]:
+        key, members = samples[i]
+        assert index[i]['__key__'] == key
+        assert bytes(index[i]['jpg']) == members['jpg'] and bytes(index[i]['txt']) == members['txt']
+
+
+def test_dataset_shuffle_reads_every_sample_once(tmp_path):
+    samples = make_samples(30)
+    shard_list = write_shards(str(tmp_path), samples, max_bytes=8 * 1024)
+
+    dataset = TarShardDataset(shard_list, shuffle_buffer=8, decode=False, seed=1)
+    keys = [sample['__key__'] for sample in dataset]
+    assert sorted(keys) == [key for key, _ in samples]
+    assert keys != [key for key, _ in samples]
+
+
+def test_decode_labels():
+    labels = np.array([[2, 0.5, 0.5, 0.25, 0.25]])
+    sample = decode_sample({'__key__': 'a', 'txt': labels_to_bytes(labels), 'json': b'{"image": 1}'})
+    assert sample['txt'].shape == (1, 5) and np.allclose(sample['txt'], labels)
+    assert sample['json'] == {'image': 1}
+    for data in [b'', b'\n', memoryview(b'')]:
+        empty = decode_sample({'__key__': 'b', 'txt': data})
+        assert empty['txt'].shape == (0, 5) and empty['txt'].dtype == np.float32
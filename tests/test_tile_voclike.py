@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/25 14:20
+@File    : test_tile_voclike.py
+@Author  : zj
+@Description:
+
+Tile layout and box clipping of `py/tile_voclike.py`.
+
+"""
+import numpy as np
+
+from tile_voclike import clip_boxes, make_tiles, tile_starts
+
+
+def test_tile_starts_cover_the_image():
+    assert tile_starts(1000, 400, 300).tolist() == [0, 300, 600]
+    # The last tile is aligned to the border
+    assert tile_starts(1000, 400, 320).tolist() == [0, 320, 600]
+    assert tile_starts(300, 400, 320).tolist() == [0]
+
+
+def test_make_tiles_are_clipped_to_the_image():
+    tiles = make_tiles(500, 300, 400, 400, 320, 320)
+    assert tiles.tolist() == [[0, 0, 400, 300], [100, 0, 500, 300]]
+
+
+def test_clip_boxes():
+    boxes = np.array([[10, 10, 50, 50], [90, 90, 130, 130]], dtype=np.float64)
+    tiles = np.array([[0, 0, 100, 100], [80, 80, 180, 180]])
+
+    clipped, keep = clip_boxes(boxes, tiles, min_visible=0.5)
+    assert clipped.shape == (2, 2, 4)
+    # Box 0 lies inside tile 0, box 1 inside tile 1, each only overlaps the other tile a little or not at all
+    assert keep.tolist() == [[True, False], [False, True]]
+    assert clipped[0, 0].tolist() == [10, 10, 50, 50]
+    # In tile coordinates
+    assert clipped[1, 1].tolist() == [10, 10, 50, 50]
+
+    clipped, keep = clip_boxes(boxes, tiles, min_visible=0.0)
+    assert keep.tolist() == [[True, True], [False, True]]
+    assert clipped[0, 1].tolist() == [90, 90, 100, 100]
+
+
+def test_clip_boxes_drops_empty_boxes():
+    boxes = np.array([[20, 20, 20, 40], [0, 0, 0, 0]], dtype=np.float64)
+    tiles = np.array([[0, 0, 100, 100]])
+    _, keep = clip_boxes(boxes, tiles, min_visible=0.0)
+    assert keep.tolist() == [[False, False]]
+
+
+def test_clip_boxes_without_boxes():
+    clipped, keep = clip_boxes(np.zeros((0, 4)), np.array([[0, 0, 100, 100]]), min_visible=0.5)
+    assert clipped.shape == (1, 0, 4) and keep.shape == (1, 0)
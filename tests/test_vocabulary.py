@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+@Time    : 2026/10/25 15:40
+@File    : test_vocabulary.py
+@Author  : zj
+@Description:
+
+Class id mapping of `Vocabulary` and `Relabel`.
+
+"""
+import numpy as np
+import pytest
+
+from annotations import ImageRecord
+from vocabulary import Relabel, Vocabulary, parse_rules
+
+
+def test_load_skips_comments_and_blank_lines(tmp_path):
+    class_path = tmp_path / 'classes.names'
+    class_path.write_text("# header\ncat\n\ndog  # pet\n  bird\n")
+    vocab = Vocabulary.load(str(class_path))
+    assert vocab.names == ['cat', 'dog', 'bird']
+
+    # A single class is a list of one
+    class_path.write_text("person\n")
+    assert Vocabulary.load(str(class_path)).names == ['person']
+
+
+def test_repeated_name_is_rejected():
+    with pytest.raises(AssertionError):
+        Vocabulary(['cat', 'dog', 'cat'])
+
+
+def test_list_behaviour_and_aliases():
+    vocab = Vocabulary(['person', 'car'], aliases={'people': 'person'})
+    assert vocab.index('car') == 1 and vocab.index('people') == 0
+    assert 'people' in vocab and 'bus' not in vocab
+    assert vocab[1] == 'car' and len(vocab) == 2 and list(vocab) == ['person', 'car']
+    assert vocab.id_of('bus') == -1
+    assert vocab.ids_of(['car', 'bus', 'people']).tolist() == [1, -1, 0]
+    with pytest.raises(ValueError):
+        vocab.index('bus')
+    with pytest.raises(AssertionError):
+        Vocabulary(['person'], aliases={'people': 'human'})
+
+
+def test_parse_rules():
+    assert parse_rules(['b=a', ' d = e ']) == {'b': 'a', 'd': 'e'}
+    with pytest.raises(AssertionError):
+        parse_rules(['a'])
+
+
+def make_relabel() -> Relabel:
+    return Relabel(Vocabulary(['a', 'b', 'c', 'd']), merge={'b': 'a', 'd': 'e'}, drop=['c'])
+
+
+def test_relabel_remap():
+    relabel = make_relabel()
+    assert relabel.dst.names == ['a', 'e']
+    assert not relabel.identity
+
+    class_ids, keep = relabel.remap(np.array([0, 1, 2, 3, -1]))
+    assert class_ids.tolist() == [0, 0, -1, 1, -1]
+    assert keep.tolist() == [True, True, False, True, True]
+    with pytest.raises(AssertionError):
+        relabel.remap(np.array([4]))
+
+
+def test_relabel_labels_and_records():
+    relabel = make_relabel()
+    labels = np.array([[0, 0.1, 0.1, 0.2, 0.2],
+                       [2, 0.3, 0.3, 0.2, 0.2],
+                       [3, 0.5, 0.5, 0.2, 0.2],
+                       [1, 0.7, 0.7, 0.2, 0.2]])
+    result = relabel.remap_labels(labels)
+    assert result[:, 0].tolist() == [0, 1, 0]
+    assert np.array_equal(result[:, 1:], labels[[0, 2, 3], 1:])
+
+    record = ImageRecord('a.jpg', 'a.xml', 100, 100, np.arange(16, dtype=np.float64).reshape(4, 4),
+                         np.array([1, 2, 3, -1]), ('b', 'c', 'd', 'x'), np.array([False, True, False, True]))
+    result = relabel.apply(record)
+    assert result.class_ids.tolist() == [0, 1, -1]
+    assert result.names == ('a', 'e', 'x')
+    assert result.difficult.tolist() == [False, False, True]
+    assert np.array_equal(result.boxes, record.boxes[[0, 2, 3]])
+
+
+def test_relabel_identity():
+    vocab = Vocabulary(['a', 'b'])
+    relabel = Relabel(vocab)
+    assert relabel.identity
+    labels = np.array([[1, 0.5, 0.5, 0.1, 0.1]])
+    assert np.array_equal(relabel.remap_labels(labels), labels)
+    with pytest.raises(AssertionError):
+        Relabel(vocab, drop=['z'])